@@ -1,19 +1,33 @@
-from flask import Flask, request, redirect, render_template, session, url_for, flash, abort
+from flask import (
+    Flask, request, redirect, render_template, session, url_for, flash, abort, g, has_request_context,
+    jsonify, Response, make_response
+)
 from functools import wraps
+import os
+import json
+import time
+import uuid
+import socket
+import click
 from config import Config
 from services.qbo_service import QBOService
 from services.data_service import DataService
-from database import SessionLocal, truncate_tables
+from services.archive_service import PayloadArchive
+from services.analytics_service import SnapshotExporter
+from services.sync_state_service import SyncStateService
+from database import SessionLocal, engine, truncate_tables, TRUNCATE_ON_STARTUP
 from utils.auth import (
     redirect_to_authorization,
     exchange_code_for_token,
     is_authenticated,
     handle_callback
 )
-from models.bill import Bill
-from models.customer import Customer, CustomerMetaData
+from models.bill import Bill, Vendor, VendorAddress, Currency, BillMetaData, BillLineItem
+from models.customer import Customer, CustomerAddress, CustomerMetaData
 from models.fetch_settings import FetchSettings
+from models.listing import BillListing, CustomerListing
 import logging
+from sqlalchemy import event
 from sqlalchemy.exc import SQLAlchemyError
 from requests.exceptions import RequestException
 
@@ -26,7 +40,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Truncate tables on startup in development
-if app.config.get('ENV') == 'development':
+if app.config.get('ENV') == 'development' and TRUNCATE_ON_STARTUP:
     try:
         truncate_tables()
     except Exception as e:
@@ -36,6 +50,21 @@ if app.config.get('ENV') == 'development':
 # Constants for pagination
 DEFAULT_PER_PAGE = 10
 
+# Set on responses that rendered an error fallback instead of the real page
+DEGRADED_HEADER = 'X-Degraded'
+
+# Report the number of SQL statements each request ran, for the load-test harness
+if Config.QUERY_COUNT_HEADER:
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.query_count = g.get('query_count', 0) + 1
+
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+        return response
+
 def handle_database_error(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -114,19 +143,27 @@ def home(db):
         bills_per_page = settings.bills_fetch_count 
         customers_per_page = settings.customers_fetch_count
         
-        # Bills pagination
-        bills_query = db.query(Bill).order_by(Bill.txn_date.desc())
+        # Bills pagination (served from the listing read model)
+        bills_query = db.query(BillListing).order_by(BillListing.txn_date.desc(), BillListing.bill_id.desc())
         total_bills = bills_query.count()
         bills = bills_query.offset((bill_page - 1) * bills_per_page).limit(bills_per_page).all()
         
         # Customers pagination
-        customers_query = db.query(Customer).order_by(Customer.display_name)
+        customers_query = db.query(CustomerListing).order_by(CustomerListing.display_name, CustomerListing.customer_id)
         total_customers = customers_query.count()
         customers = customers_query.offset((customer_page - 1) * customers_per_page).limit(customers_per_page).all()
         
         # Calculate total pages for each
         bills_total_pages = (total_bills + bills_per_page - 1) // bills_per_page
         customers_total_pages = (total_customers + customers_per_page - 1) // customers_per_page
+
+        # Only show the progress panel while the job is still running
+        sync_job_id = session.get('sync_job_id')
+        if sync_job_id:
+            progress = SyncStateService(db).progress(sync_job_id)
+            if progress is None or progress["complete"]:
+                session.pop('sync_job_id', None)
+                sync_job_id = None
         
         return render_template("index.html", 
                            bills=bills,
@@ -141,14 +178,24 @@ def home(db):
                            customers_per_page=customers_per_page,
                            bills_fetch_count=settings.bills_fetch_count,
                            customers_fetch_count=settings.customers_fetch_count,
+                           sync_job_id=sync_job_id,
                            is_authenticated=is_authenticated())
     except Exception as e:
         logger.error(f"Home page error: {str(e)}")
         flash("Failed to load data. Please try again.", "error")
-        return render_template("index.html", 
+        response = make_response(render_template("index.html", 
                            bills=[],
+                           bills_page=1,
+                           bills_total_pages=0,
+                           bills_total=0,
                            customers=[],
-                           is_authenticated=is_authenticated())
+                           customers_page=1,
+                           customers_total_pages=0,
+                           customers_total=0,
+                           is_authenticated=is_authenticated()))
+        # Lets the load-test client tell this fallback apart from a real page
+        response.headers[DEGRADED_HEADER] = '1'
+        return response
 
 @app.route("/fetch-all")
 @login_required
@@ -157,13 +204,29 @@ def fetch_all(db):
     try:
         data_service = DataService(db)
         settings = data_service.get_fetch_settings()
+        sync_service = SyncStateService(db)
+        page_sizes = {"Bill": settings.bills_fetch_count, "Customer": settings.customers_fetch_count}
         
-        if session.get('qb_bill_next_start_position') is None or session.get('qb_bill_next_start_position') == -1:
-            session['qb_bill_next_start_position'] = 1
-            session['qb_customer_next_start_position'] = 1
+        if all(sync_service.is_complete(Config.REALM_ID, entity) for entity in page_sizes):
+            job_id = str(uuid.uuid4())
+            qbo_service = QBOService(db)
+            for entity, page_size in page_sizes.items():
+                try:
+                    total_count = qbo_service.fetch_count(entity, session['access_token'])
+                except Exception as e:
+                    # Only the ETA depends on it
+                    logger.warning(f"Failed to count {ENTITY_LABELS[entity]}: {str(e)}")
+                    total_count = None
+                if not sync_service.start(Config.REALM_ID, entity, page_size, job_id=job_id,
+                                          total_count=total_count):
+                    # Another session started this sync first; join its job
+                    # rather than splitting the entities across two job ids
+                    break
+            session.pop('batch_fault_counts', None)
             flash("Initiating data fetch...", "info")
         else:
             flash("Continuing data fetch...", "info")
+        session['sync_job_id'] = sync_service.job_id(Config.REALM_ID, "Bill")
         
         return redirect(url_for("fetch_all_worker"))
     except Exception as e:
@@ -171,6 +234,105 @@ def fetch_all(db):
         flash("Failed to initiate data fetch. Please try again.", "error")
         return redirect(url_for("home"))
 
+ENTITY_LABELS = {"Bill": "bills", "Customer": "customers"}
+
+def sync_owner():
+    """Identify this request as a lease owner in the sync cursor table"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def fetch_page(db, qbo_service, sync_service, entity, owner):
+    """Claim, fetch and persist one page of ``entity``. Returns False if nothing was claimable."""
+    fetchers = {"Bill": qbo_service.fetch_bills, "Customer": qbo_service.fetch_customers}
+    processors = {"Bill": qbo_service.process_bills, "Customer": qbo_service.process_customers}
+
+    leases = sync_service.claim(Config.REALM_ID, entity, owner)
+    if not leases:
+        return False
+    lease = leases[0]
+
+    try:
+        started = time.perf_counter()
+        records = fetchers[entity](lease["start_position"], lease["max_results"], session['access_token'])
+        fetched = time.perf_counter()
+        # Extend the lease for the write; if it expired and was reclaimed, leave the page to its new owner
+        if not sync_service.renew(lease["lease_id"], owner):
+            logger.warning(f"Lost lease on {entity} page at {lease['start_position']}; skipping")
+            return True
+        if records:
+            processors[entity](records)
+            db.commit()
+        persisted = time.perf_counter()
+    except Exception:
+        db.rollback()
+        sync_service.release(lease["lease_id"], owner)
+        raise
+    if not sync_service.complete(lease["lease_id"], owner, len(records),
+                                 api_seconds=fetched - started, db_seconds=persisted - fetched):
+        logger.warning(f"Lost lease on {entity} page at {lease['start_position']} before completing it")
+    return True
+
+def fetch_batched(db, qbo_service, sync_service, owner):
+    """Claim several pages per entity and fetch them through one /batch call.
+
+    Faulted batch items release their lease so the page is retried on a later
+    pass. Returns False if nothing was claimable, and raises once any page
+    has faulted QBO_BATCH_MAX_FAULTS times in a row.
+    """
+    processors = {"Bill": qbo_service.process_bills, "Customer": qbo_service.process_customers}
+    leases = []
+    for entity in ENTITY_LABELS:
+        for lease in sync_service.claim(Config.REALM_ID, entity, owner, pages=Config.QBO_BATCH_PAGES_PER_ENTITY):
+            leases.append((entity, lease))
+    if not leases:
+        return False
+
+    page_requests = [(entity, lease["start_position"], lease["max_results"]) for entity, lease in leases]
+    try:
+        started = time.perf_counter()
+        results = qbo_service.fetch_batch(page_requests, session['access_token'])
+        # One request served every page; attribute its latency evenly
+        api_seconds = (time.perf_counter() - started) / len(page_requests)
+    except Exception:
+        for _, lease in leases:
+            sync_service.release(lease["lease_id"], owner)
+        raise
+
+    # Consecutive faults per page, so a page that always faults stops the worker
+    fault_counts = session.get('batch_fault_counts', {})
+    failed_pages = []
+    for index, ((entity, lease), result) in enumerate(zip(leases, results)):
+        page_key = f"{entity}:{lease['start_position']}"
+        if result["fault"]:
+            logger.warning(f"Batch item for {entity} at {lease['start_position']} failed: {result['fault']}")
+            fault_counts[page_key] = fault_counts.get(page_key, 0) + 1
+            if fault_counts[page_key] >= Config.QBO_BATCH_MAX_FAULTS:
+                failed_pages.append(f"{entity} page at {lease['start_position']}: {result['fault']}")
+            sync_service.release(lease["lease_id"], owner)
+            continue
+        fault_counts.pop(page_key, None)
+        if not sync_service.renew(lease["lease_id"], owner):
+            logger.warning(f"Lost lease on {entity} page at {lease['start_position']}; skipping")
+            continue
+        try:
+            started = time.perf_counter()
+            if result["records"]:
+                processors[entity](result["records"])
+                db.commit()
+            db_seconds = time.perf_counter() - started
+        except Exception:
+            db.rollback()
+            for _, pending in leases[index:]:
+                sync_service.release(pending["lease_id"], owner)
+            raise
+        if not sync_service.complete(lease["lease_id"], owner, len(result["records"]),
+                                     api_seconds=api_seconds, db_seconds=db_seconds):
+            logger.warning(f"Lost lease on {entity} page at {lease['start_position']} before completing it")
+
+    session['batch_fault_counts'] = fault_counts
+    if failed_pages:
+        raise Exception(f"Batch items failed {Config.QBO_BATCH_MAX_FAULTS} times: {'; '.join(failed_pages)}")
+    return True
+
 @app.route("/fetch-all-worker")
 @login_required
 @handle_database_error
@@ -180,65 +342,52 @@ def fetch_all_worker(db):
             flash("Not authenticated. Please login first.", "error")
             return redirect(url_for('login'))
             
-        data_service = DataService(db)
         qbo_service = QBOService(db)
-        settings = data_service.get_fetch_settings()
-        
-        bill_position = session.get('qb_bill_next_start_position', 1)
-        customer_position = session.get('qb_customer_next_start_position', 1)
+        sync_service = SyncStateService(db)
+        owner = sync_owner()
+        claimed = False
 
-        # Fetch bills if not completed
-        if bill_position != -1:
+        if Config.QBO_BATCH_ENABLED:
             try:
-                bills_data = qbo_service.fetch_bills(
-                    bill_position, 
-                    settings.bills_fetch_count, 
-                    session['access_token']
-                )
-                if bills_data:
-                    qbo_service.process_bills(bills_data)
-                    db.commit()
-                    session['qb_bill_next_start_position'] = bill_position + len(bills_data)
-                else:
-                    session['qb_bill_next_start_position'] = -1
-            except RequestException as e:
-                logger.error(f"Failed to fetch bills: {str(e)}")
-                flash("Failed to fetch bills from QuickBooks. Please try again.", "error")
-                return redirect(url_for('home'))
+                claimed = fetch_batched(db, qbo_service, sync_service, owner)
             except Exception as e:
                 db.rollback()
-                logger.error(f"Failed to process bills: {str(e)}")
-                flash("Failed to process bills data. Please try again.", "error")
-                return redirect(url_for('home'))
-        
-        # Fetch customers if not completed
-        if customer_position != -1:
-            try:
-                customers_data = qbo_service.fetch_customers(
-                    customer_position,
-                    settings.customers_fetch_count,
-                    session['access_token']
-                )
-                if customers_data:
-                    qbo_service.process_customers(customers_data)
-                    db.commit()
-                    session['qb_customer_next_start_position'] = customer_position + len(customers_data)
-                else:
-                    session['qb_customer_next_start_position'] = -1
-            except RequestException as e:
-                logger.error(f"Failed to fetch customers: {str(e)}")
-                flash("Failed to fetch customers from QuickBooks. Please try again.", "error")
-                return redirect(url_for('home'))
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Failed to process customers: {str(e)}")
-                flash("Failed to process customers data. Please try again.", "error")
+                logger.error(f"Failed to fetch batch: {str(e)}")
+                flash("Failed to fetch data from QuickBooks. Please try again.", "error")
                 return redirect(url_for('home'))
+        else:
+            for entity, label in ENTITY_LABELS.items():
+                try:
+                    claimed = fetch_page(db, qbo_service, sync_service, entity, owner) or claimed
+                except RequestException as e:
+                    logger.error(f"Failed to fetch {label}: {str(e)}")
+                    flash(f"Failed to fetch {label} from QuickBooks. Please try again.", "error")
+                    return redirect(url_for('home'))
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Failed to process {label}: {str(e)}")
+                    flash(f"Failed to process {label} data. Please try again.", "error")
+                    return redirect(url_for('home'))
         
-        if session['qb_bill_next_start_position'] != -1 or session['qb_customer_next_start_position'] != -1:
-            flash("Fetching next batch...", "info")
+        logger.info(f"Fetch worker peak session size: {qbo_service.peak_session_size} objects")
+
+        if not all(sync_service.is_complete(Config.REALM_ID, entity) for entity in ENTITY_LABELS):
+            if not claimed:
+                # Remaining pages are leased by other workers
+                flash("Another worker is fetching the remaining data.", "info")
+                return redirect(url_for("home"))
+            # Progress is reported through /sync/<job_id>/events rather than flashes
             return redirect(url_for("fetch_all_worker"))
         
+        if Config.ANALYTICS_SNAPSHOT_ENABLED:
+            try:
+                counts = SnapshotExporter(db).export()
+                logger.info(f"Analytics snapshot exported: {counts}")
+            except Exception as e:
+                # The sync itself succeeded; a stale snapshot is not fatal
+                logger.error(f"Failed to export analytics snapshot: {str(e)}")
+
+        session.pop('sync_job_id', None)
         flash("All data fetched successfully!", "success")
         return redirect(url_for("home"))
     except Exception as e:
@@ -246,5 +395,120 @@ def fetch_all_worker(db):
         flash("An error occurred during data fetch. Please try again.", "error")
         return redirect(url_for("home"))
 
+@app.route("/sync/<job_id>/status")
+@login_required
+@handle_database_error
+def sync_status(db, job_id):
+    progress = SyncStateService(db).progress(job_id)
+    if progress is None:
+        return jsonify({"error": "Unknown sync job"}), 404
+    return jsonify(progress)
+
+@app.route("/sync/<job_id>/events")
+@login_required
+def sync_events(job_id):
+    """Server-Sent Events stream of a sync job's progress.
+
+    The stream ends when the job completes, when no page has landed for a
+    lease period (``stalled``), or after ``SYNC_EVENTS_MAX_SECONDS``, in which
+    case the browser's EventSource reconnects and a fresh stream picks up.
+    """
+    def stream():
+        opened = time.monotonic()
+        last_entities = None
+        last_sent = opened
+        yield f"retry: {int(Config.SYNC_EVENTS_RETRY_SECONDS * 1000)}\n\n"
+        while time.monotonic() - opened < Config.SYNC_EVENTS_MAX_SECONDS:
+            db = SessionLocal()
+            try:
+                progress = SyncStateService(db).progress(job_id)
+            finally:
+                db.close()
+
+            if progress is None:
+                yield 'event: unknown\ndata: {"error": "Unknown sync job"}\n\n'
+                return
+            payload = json.dumps(progress)
+            if progress["complete"]:
+                yield f"event: complete\ndata: {payload}\n\n"
+                return
+            if progress["idle_seconds"] is not None and progress["idle_seconds"] > Config.SYNC_LEASE_SECONDS:
+                # No worker is making progress; don't hold the connection open for it
+                yield f"event: stalled\ndata: {payload}\n\n"
+                return
+            # idle_seconds ticks on every poll; only push when an entity moved
+            entities = json.dumps(progress["entities"])
+            if entities != last_entities:
+                yield f"data: {payload}\n\n"
+                last_entities = entities
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= Config.SYNC_EVENTS_HEARTBEAT_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(Config.SYNC_EVENTS_POLL_SECONDS)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.cli.command("replay-archive")
+@click.option("--archive-dir", default=None, help="Archive root (defaults to Config.ARCHIVE_DIR).")
+@click.option("--entity", "entities", multiple=True, type=click.Choice(["Bill", "Customer"]),
+              help="Entity to replay; may be repeated. Defaults to all.")
+@click.option("--realm-id", default=None, help="Only replay pages archived for this realm.")
+@click.option("--reset", is_flag=True, help="Empty the ingested tables first, for a clean benchmark baseline.")
+def replay_archive(archive_dir, entities, realm_id, reset):
+    """Re-run ingest from archived QuickBooks pages, with no network access."""
+    archive = PayloadArchive(root=archive_dir)
+    db = SessionLocal()
+    try:
+        if reset:
+            # Children before parents, so foreign keys hold on every backend
+            DataService(db).truncate_tables([
+                BillLineItem, BillMetaData, Bill, VendorAddress, Vendor, Currency,
+                CustomerAddress, CustomerMetaData, Customer, BillListing, CustomerListing
+            ])
+        # The archive is only the input here; replayed pages must not be re-archived
+        qbo_service = QBOService(db, archive_enabled=False)
+        started = time.perf_counter()
+        counts = qbo_service.replay_archive(archive, entities or ("Bill", "Customer"), realm_id)
+        elapsed = time.perf_counter() - started
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    total_records = sum(c["records"] for c in counts.values())
+    for entity, c in counts.items():
+        click.echo(f"{entity}: {c['pages']} pages, {c['records']} records")
+    rate = total_records / elapsed if elapsed else 0
+    click.echo(f"Replayed {total_records} records in {elapsed:.2f}s ({rate:.0f} records/s)")
+    click.echo(f"Peak session size: {qbo_service.peak_session_size} objects")
+    click.echo(f"Normalization: {qbo_service.normalize_seconds:.2f}s of {elapsed:.2f}s")
+
+@app.cli.command("export-snapshot")
+@click.option("--snapshot-dir", default=None, help="Snapshot directory (defaults to Config.ANALYTICS_SNAPSHOT_DIR).")
+def export_snapshot(snapshot_dir):
+    """Write the columnar analytics snapshot of bills and line items."""
+    db = SessionLocal()
+    try:
+        counts = SnapshotExporter(db, root=snapshot_dir).export()
+    finally:
+        db.close()
+    click.echo(f"Exported {counts['bills']} bills and {counts['line_items']} line items")
+
+@app.cli.command("rebuild-listings")
+def rebuild_listings():
+    """Repopulate the listing read models from the normalized tables.
+
+    Run once after creating the listing tables; home() reads only from them.
+    """
+    db = SessionLocal()
+    try:
+        DataService(db).rebuild_listings()
+    finally:
+        db.close()
+    click.echo("Listing tables rebuilt")
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
\ No newline at end of file
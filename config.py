@@ -15,4 +15,34 @@ class Config:
     
     # Fetch settings
     DEFAULT_BILL_FETCH_COUNT = 3
-    DEFAULT_CUSTOMER_FETCH_COUNT = 5
\ No newline at end of file
+    DEFAULT_CUSTOMER_FETCH_COUNT = 5
+
+    # Sync cursor: how long a worker may hold a claimed page range
+    SYNC_LEASE_SECONDS = int(os.getenv('SYNC_LEASE_SECONDS', '300'))
+
+    # Sync progress stream
+    SYNC_EVENTS_POLL_SECONDS = 1.0
+    SYNC_EVENTS_HEARTBEAT_SECONDS = 15.0
+    SYNC_EVENTS_MAX_SECONDS = int(os.getenv('SYNC_EVENTS_MAX_SECONDS', '300'))  # per connection
+    SYNC_EVENTS_RETRY_SECONDS = 3.0  # client reconnect delay
+
+    # Batch fetch mode: pack several page queries into one /batch request
+    QBO_BATCH_ENABLED = os.getenv('QBO_BATCH_ENABLED', '0') == '1'
+    QBO_BATCH_PAGES_PER_ENTITY = int(os.getenv('QBO_BATCH_PAGES_PER_ENTITY', '5'))
+    QBO_BATCH_MAX_ITEMS = 30  # QuickBooks limit per batch request
+    QBO_BATCH_MAX_FAULTS = int(os.getenv('QBO_BATCH_MAX_FAULTS', '3'))  # Per page, before the worker gives up
+
+    # Ingest: commit and release ORM objects every N records (0 disables chunking)
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', '200'))
+
+    # Columnar analytics snapshot, rewritten after each completed sync
+    ANALYTICS_SNAPSHOT_ENABLED = os.getenv('ANALYTICS_SNAPSHOT_ENABLED', '0') == '1'
+    ANALYTICS_SNAPSHOT_DIR = os.getenv('ANALYTICS_SNAPSHOT_DIR', 'analytics')
+
+    # Load testing: add an X-Query-Count header with the SQL statements per request
+    QUERY_COUNT_HEADER = os.getenv('QUERY_COUNT_HEADER', '0') == '1'
+
+    # Raw payload archive
+    ARCHIVE_ENABLED = os.getenv('QBO_ARCHIVE_ENABLED', '0') == '1'
+    ARCHIVE_DIR = os.getenv('QBO_ARCHIVE_DIR', 'archive')
+    ARCHIVE_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
@@ -0,0 +1,152 @@
+"""Concurrent HTTP load client for the Flask endpoints.
+
+Usage:
+    python -m loadtest.client --base-url http://127.0.0.1:5000 \\
+        --concurrency 16 --duration 60 --max-bill-page 2000 --max-customer-page 1000
+
+Start the app with QUERY_COUNT_HEADER=1 to get queries per request. Reports
+p50/p95/p99 latency, throughput and queries per request for each route.
+Any non-2xx response counts as an error, as does a page the app rendered as an
+error fallback (marked with an X-Degraded header).
+Returns a non-zero exit status when a --max-p95-ms or --max-error-rate
+threshold is exceeded, so it can gate a deploy.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+DEGRADED_HEADER = "X-Degraded"
+
+def build_scenarios(max_bill_page, max_customer_page, extra_paths):
+    """List of (label, path factory) pairs making up the request mix"""
+    deep_bill, deep_customer = max(1, max_bill_page // 2), max(1, max_customer_page // 2)
+    scenarios = [
+        ("home first page", lambda rng: "/"),
+        ("home bill page", lambda rng: f"/?bill_page={rng.randint(1, max_bill_page)}"),
+        ("home customer page", lambda rng: f"/?customer_page={rng.randint(1, max_customer_page)}"),
+        ("home deep pages", lambda rng: f"/?bill_page={rng.randint(deep_bill, max_bill_page)}"
+                                        f"&customer_page={rng.randint(deep_customer, max_customer_page)}"),
+        ("home last pages", lambda rng: f"/?bill_page={max_bill_page}&customer_page={max_customer_page}"),
+    ]
+    scenarios.extend((path, lambda rng, path=path: path) for path in extra_paths)
+    return scenarios
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def run_worker(base_url, scenarios, deadline, seed, results, lock):
+    rng = random.Random(seed)
+    http = requests.Session()
+    local = []
+    while time.perf_counter() < deadline:
+        label, make_path = rng.choice(scenarios)
+        started = time.perf_counter()
+        try:
+            response = http.get(base_url + make_path(rng), allow_redirects=False, timeout=30)
+            status = response.status_code
+            queries = response.headers.get("X-Query-Count")
+            # Redirects are errors too: the app answers a failed page with a redirect home
+            failed = not 200 <= status < 300 or DEGRADED_HEADER in response.headers
+        except requests.exceptions.RequestException:
+            status, queries, failed = None, None, True
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        local.append((label, elapsed_ms, status, int(queries) if queries is not None else None, failed))
+    with lock:
+        results.extend(local)
+
+def run_phase(base_url, scenarios, concurrency, duration, seed):
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_worker, base_url, scenarios, deadline, seed * 1000 + i, results, lock)
+            for i in range(concurrency)
+        ]
+    # Re-raise any worker failure; otherwise its samples would silently vanish from the report
+    for future in futures:
+        future.result()
+    return results
+
+def summarize(samples, duration):
+    latencies = sorted(sample[1] for sample in samples)
+    errors = sum(1 for sample in samples if sample[4])
+    queries = [sample[3] for sample in samples if sample[3] is not None]
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / duration if duration else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "queries_per_request": sum(queries) / len(queries) if queries else None,
+    }
+
+def format_report(report):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    lines = [f"{'route':<22}{'reqs':>8}{'errs':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/req':>7}"]
+    for label, stats in list(report["routes"].items()) + [("TOTAL", report["total"])]:
+        lines.append(
+            f"{label[:21]:<22}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>9.1f}"
+            f"{fmt(stats['p50_ms'], '.1f'):>9}{fmt(stats['p95_ms'], '.1f'):>9}{fmt(stats['p99_ms'], '.1f'):>9}"
+            f"{fmt(stats['queries_per_request'], '.1f'):>7}"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a concurrent load test against the Flask app.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run after warmup.")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of unrecorded warmup traffic.")
+    parser.add_argument("--max-bill-page", type=int, default=2000)
+    parser.add_argument("--max-customer-page", type=int, default=1000)
+    parser.add_argument("--path", dest="paths", action="append", default=[],
+                        help="Extra route to include in the mix; may be repeated.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this file.")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if overall p95 latency exceeds this.")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Fail if the error rate exceeds this.")
+    args = parser.parse_args(argv)
+
+    base_url = args.base_url.rstrip("/")
+    scenarios = build_scenarios(args.max_bill_page, args.max_customer_page, args.paths)
+
+    if args.warmup > 0:
+        run_phase(base_url, scenarios, args.concurrency, args.warmup, args.seed)
+    results = run_phase(base_url, scenarios, args.concurrency, args.duration, args.seed + 1)
+
+    routes = {}
+    for sample in results:
+        routes.setdefault(sample[0], []).append(sample)
+    report = {
+        "base_url": base_url,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "routes": {label: summarize(samples, args.duration) for label, samples in sorted(routes.items())},
+        "total": summarize(results, args.duration),
+    }
+
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = report["total"]["error_rate"] > args.max_error_rate
+    if args.max_p95_ms is not None and (report["total"]["p95_ms"] or 0) > args.max_p95_ms:
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Bulk-generate realistic rows for load testing.
+
+Usage:
+    DATABASE_URL=sqlite:///loadtest.db python -m loadtest.seed --create-schema --reset \\
+        --bills 100000 --customers 50000
+
+Fills every data table in REQUIRED_TABLES and then rebuilds the listing read
+models. The sync cursor tables are left empty. Run the app against the same
+database with DB_TRUNCATE_ON_STARTUP=0 so the seeded rows survive startup.
+"""
+import os
+import random
+import argparse
+import time
+from datetime import datetime, timedelta
+
+# Seeding creates the schema and owns the data; skip the import-time table
+# check and truncation in database.py.
+os.environ.setdefault("DB_STARTUP_CHECK", "0")
+os.environ.setdefault("DB_TRUNCATE_ON_STARTUP", "0")
+
+from database import db, engine, SessionLocal, truncate_tables
+from models import (
+    Base, Vendor, VendorAddress, Currency, Bill, BillMetaData, BillLineItem,
+    Customer, CustomerAddress, CustomerMetaData, FetchSettings
+)
+from services.data_service import DataService
+
+INSERT_CHUNK = 5000
+
+CURRENCIES = [("USD", "United States Dollar"), ("EUR", "Euro"), ("GBP", "British Pound Sterling"),
+              ("CAD", "Canadian Dollar"), ("AUD", "Australian Dollar")]
+FIRST_NAMES = ["Amy", "Bill", "Carla", "Dylan", "Emma", "Frank", "Grace", "Hector", "Ivy", "Jonas",
+               "Kara", "Liam", "Mona", "Nate", "Olga", "Priya", "Quinn", "Ravi", "Sofia", "Tom"]
+LAST_NAMES = ["Anderson", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Jones",
+              "Khan", "Lopez", "Miller", "Nguyen", "Ortiz", "Patel", "Reyes", "Smith", "Taylor", "Weber"]
+COMPANY_WORDS = ["Acme", "Northwind", "Summit", "Bluebird", "Cedar", "Harbor", "Pioneer", "Granite",
+                 "Lakeside", "Redwood", "Silver", "Atlas"]
+COMPANY_SUFFIXES = ["Supply", "Services", "Landscaping", "Electric", "Plumbing", "Consulting", "Hardware"]
+CITIES = [("Mountain View", "CA", "94043"), ("Austin", "TX", "73301"), ("Denver", "CO", "80202"),
+          ("Seattle", "WA", "98101"), ("Boston", "MA", "02108"), ("Chicago", "IL", "60601")]
+ITEMS = ["Rock Fountain", "Pump", "Sprinkler Heads", "Soil", "Pipes", "Lighting", "Fertilizer",
+         "Rocks", "Sod", "Hours", "Installation", "Maintenance & Repair", "Design", "Trimming"]
+
+def insert_rows(db_session, model, rows):
+    for offset in range(0, len(rows), INSERT_CHUNK):
+        db_session.execute(model.__table__.insert(), rows[offset:offset + INSERT_CHUNK])
+
+def company_name(rng, i):
+    return f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)} {i}"
+
+def address(rng):
+    city, state, postal = rng.choice(CITIES)
+    return {
+        "line1": f"{rng.randint(1, 9999)} {rng.choice(LAST_NAMES)} St.",
+        "city": city,
+        "country_sub_division_code": state,
+        "postal_code": postal,
+    }
+
+def seed_vendors(db_session, rng, count):
+    vendors = [{"id": i, "name": company_name(rng, i), "vendor_ref": str(i)} for i in range(1, count + 1)]
+    addresses = [dict(id=i, vendor_id=i, **address(rng)) for i in range(1, count + 1)]
+    insert_rows(db_session, Vendor, vendors)
+    insert_rows(db_session, VendorAddress, addresses)
+
+def seed_currencies(db_session):
+    rows = [{"id": i, "value": value, "name": name} for i, (value, name) in enumerate(CURRENCIES, start=1)]
+    insert_rows(db_session, Currency, rows)
+
+def seed_bills(db_session, rng, count, vendor_count, now):
+    bills, metadata, line_items = [], [], []
+    line_item_id = 1
+    for i in range(1, count + 1):
+        txn_date = now - timedelta(days=rng.randint(0, 3 * 365))
+        created = txn_date + timedelta(hours=rng.randint(0, 48))
+        lines = []
+        for line_num in range(1, rng.randint(1, 5) + 1):
+            qty = rng.randint(1, 20)
+            unit_price = round(rng.lognormvariate(3, 1), 2)
+            lines.append({
+                "id": line_item_id,
+                "bill_id": i,
+                "line_num": line_num,
+                "description": None,
+                "amount": round(qty * unit_price, 2),
+                "item_name": rng.choice(ITEMS),
+                "item_ref": str(rng.randint(1, len(ITEMS))),
+                "qty": qty,
+                "unit_price": unit_price,
+            })
+            line_item_id += 1
+        total = round(sum(line["amount"] for line in lines), 2)
+        bills.append({
+            "id": i,
+            "bill_id": str(i),
+            "txn_date": txn_date,
+            "due_date": txn_date + timedelta(days=rng.choice([15, 30, 45, 60])),
+            "total_amt": total,
+            "balance": total if rng.random() < 0.3 else 0.0,
+            "vendor_id": rng.randint(1, vendor_count),
+            "currency_id": 1 if rng.random() < 0.8 else rng.randint(2, len(CURRENCIES)),
+            "fetch_date": now,
+        })
+        metadata.append({"id": i, "bill_id": i, "create_time": created,
+                         "last_updated_time": created + timedelta(days=rng.randint(0, 30))})
+        line_items.extend(lines)
+
+        # Flush in slices to keep the generator's own memory bounded
+        if len(bills) >= INSERT_CHUNK:
+            insert_rows(db_session, Bill, bills)
+            insert_rows(db_session, BillMetaData, metadata)
+            insert_rows(db_session, BillLineItem, line_items)
+            bills, metadata, line_items = [], [], []
+    insert_rows(db_session, Bill, bills)
+    insert_rows(db_session, BillMetaData, metadata)
+    insert_rows(db_session, BillLineItem, line_items)
+
+def seed_customers(db_session, rng, count, now):
+    customers, addresses, metadata = [], [], []
+    for i in range(1, count + 1):
+        given, family = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        company = company_name(rng, i) if rng.random() < 0.6 else None
+        display = f"{given} {family} {i}"
+        balance = round(rng.uniform(0, 5000), 2) if rng.random() < 0.4 else 0.0
+        customers.append({
+            "id": i,
+            "customer_id": str(i),
+            "sync_token": str(rng.randint(0, 5)),
+            "domain": "QBO",
+            "given_name": given,
+            "display_name": display,
+            "bill_with_parent": False,
+            "fully_qualified_name": display,
+            "company_name": company,
+            "family_name": family,
+            "sparse": False,
+            "primary_phone_free_form_number": f"({rng.randint(200, 999)}) 555-{rng.randint(1000, 9999)}",
+            "primary_email_addr": f"{given.lower()}.{family.lower()}{i}@example.com",
+            "active": rng.random() < 0.95,
+            "job": False,
+            "balance_with_jobs": balance,
+            "preferred_delivery_method": rng.choice(["Print", "Email", "None"]),
+            "taxable": rng.random() < 0.5,
+            "print_on_check_name": company or display,
+            "balance": balance,
+            "fetch_date": now,
+        })
+        addresses.append(dict(id=i, customer_id=i, qb_address_id=str(i), lat=None, lon=None, **address(rng)))
+        created = now - timedelta(days=rng.randint(0, 5 * 365))
+        metadata.append({"id": i, "customer_id_fk": i, "create_time": created,
+                         "last_updated_time": created + timedelta(days=rng.randint(0, 90))})
+
+        if len(customers) >= INSERT_CHUNK:
+            insert_rows(db_session, Customer, customers)
+            insert_rows(db_session, CustomerAddress, addresses)
+            insert_rows(db_session, CustomerMetaData, metadata)
+            customers, addresses, metadata = [], [], []
+    insert_rows(db_session, Customer, customers)
+    insert_rows(db_session, CustomerAddress, addresses)
+    insert_rows(db_session, CustomerMetaData, metadata)
+
+def seed_fetch_settings(db_session, bills_per_page, customers_per_page):
+    db_session.query(FetchSettings).delete()
+    db_session.add(FetchSettings(bills_fetch_count=bills_per_page, customers_fetch_count=customers_per_page))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database with generated QuickBooks data.")
+    parser.add_argument("--bills", type=int, default=100000)
+    parser.add_argument("--customers", type=int, default=50000)
+    parser.add_argument("--vendors", type=int, default=500)
+    parser.add_argument("--bills-per-page", type=int, default=50)
+    parser.add_argument("--customers-per-page", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed, for reproducible datasets.")
+    parser.add_argument("--create-schema", action="store_true", help="Create any missing tables first.")
+    parser.add_argument("--reset", action="store_true", help="Empty existing tables before seeding.")
+    args = parser.parse_args(argv)
+
+    if args.create_schema:
+        db.Model.metadata.create_all(engine)
+        Base.metadata.create_all(engine)
+    if args.reset:
+        truncate_tables()
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    started = time.perf_counter()
+    db_session = SessionLocal()
+    try:
+        seed_currencies(db_session)
+        seed_vendors(db_session, rng, args.vendors)
+        seed_bills(db_session, rng, args.bills, args.vendors, now)
+        seed_customers(db_session, rng, args.customers, now)
+        seed_fetch_settings(db_session, args.bills_per_page, args.customers_per_page)
+        db_session.commit()
+        DataService(db_session).rebuild_listings()
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+    print(f"Seeded {args.bills} bills, {args.customers} customers and {args.vendors} vendors "
+          f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+-- Server-side sync cursor (models/sync_state.py).
+-- Apply before deploying: both tables are in REQUIRED_TABLES, so the app
+-- refuses to start without them.
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    id INTEGER NOT NULL AUTO_INCREMENT,
+    realm_id VARCHAR(50) NOT NULL,
+    entity VARCHAR(20) NOT NULL,
+    page_size INTEGER NOT NULL DEFAULT 1,
+    next_start_position INTEGER NOT NULL DEFAULT 1,
+    exhausted BOOL NOT NULL DEFAULT FALSE,
+    started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_sync_state_realm_entity UNIQUE (realm_id, entity),
+    INDEX ix_sync_state_id (id)
+);
+
+CREATE TABLE IF NOT EXISTS sync_leases (
+    id INTEGER NOT NULL AUTO_INCREMENT,
+    sync_state_id INTEGER NOT NULL,
+    start_position INTEGER NOT NULL,
+    max_results INTEGER NOT NULL,
+    owner VARCHAR(100) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    INDEX ix_sync_leases_id (id),
+    INDEX ix_sync_leases_sync_state_id (sync_state_id),
+    FOREIGN KEY (sync_state_id) REFERENCES sync_state (id)
+);
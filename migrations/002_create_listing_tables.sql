@@ -0,0 +1,27 @@
+-- Listing read models for the home page (models/listing.py).
+-- Apply before deploying: both tables are in REQUIRED_TABLES, so the app
+-- refuses to start without them. Then run `flask rebuild-listings` once to
+-- backfill them from existing bills and customers; home() reads only these
+-- tables and shows nothing that was ingested before they existed.
+
+CREATE TABLE IF NOT EXISTS bill_listings (
+    bill_id VARCHAR(20) NOT NULL,
+    txn_date DATETIME,
+    vendor_name VARCHAR(255),
+    total_amt FLOAT,
+    balance FLOAT,
+    currency VARCHAR(10),
+    fetch_date DATETIME,
+    PRIMARY KEY (bill_id),
+    INDEX ix_bill_listings_txn_date_covering (txn_date, bill_id, vendor_name, total_amt, balance, currency, fetch_date)
+);
+
+CREATE TABLE IF NOT EXISTS customer_listings (
+    display_name VARCHAR(255) NOT NULL,
+    customer_id VARCHAR(50) NOT NULL,
+    company_name VARCHAR(255),
+    primary_email_addr VARCHAR(255),
+    fetch_date DATETIME,
+    PRIMARY KEY (display_name, customer_id),
+    UNIQUE INDEX ix_customer_listings_customer_id (customer_id)
+);
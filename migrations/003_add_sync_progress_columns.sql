@@ -0,0 +1,15 @@
+-- Sync job progress counters on sync_state (models/sync_state.py), read by
+-- /sync/<job_id>/status and /sync/<job_id>/events. Apply after 001.
+
+ALTER TABLE sync_state
+    ADD COLUMN job_id VARCHAR(36),
+    ADD COLUMN total_count INTEGER,
+    ADD COLUMN pages_fetched INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN records_fetched INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN api_seconds FLOAT NOT NULL DEFAULT 0,
+    ADD COLUMN db_seconds FLOAT NOT NULL DEFAULT 0,
+    ADD COLUMN last_api_seconds FLOAT,
+    ADD COLUMN last_db_seconds FLOAT,
+    ADD COLUMN recent_records_per_second FLOAT,
+    ADD COLUMN last_page_at DATETIME,
+    ADD INDEX ix_sync_state_job_id (job_id);
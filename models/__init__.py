@@ -2,11 +2,15 @@
 from .bill import Bill, Vendor, VendorAddress, Currency, BillMetaData, BillLineItem
 from .customer import Customer, CustomerAddress, CustomerMetaData
 from .fetch_settings import FetchSettings
+from .sync_state import SyncState, SyncLease
+from .listing import BillListing, CustomerListing
 from .base import Base
 
 __all__ = [
     'Bill', 'Vendor', 'VendorAddress', 'Currency', 'BillMetaData', 'BillLineItem',
     'Customer', 'CustomerAddress', 'CustomerMetaData',
     'FetchSettings',
+    'SyncState', 'SyncLease',
+    'BillListing', 'CustomerListing',
     'Base'
 ]
\ No newline at end of file
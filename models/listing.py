@@ -0,0 +1,37 @@
+# models/listing.py
+from sqlalchemy import Column, String, Float, DateTime, Index
+from database import db
+
+# Read models for the listing pages. Both are written by the ingest path in the
+# same transaction as the normalized tables, and hold only the columns the
+# listings render so each page is served by a single index scan.
+
+class BillListing(db.Model):
+    __tablename__ = "bill_listings"
+    bill_id = Column(String(20), primary_key=True)
+    txn_date = Column(DateTime)
+    vendor_name = Column(String(255))
+    total_amt = Column(Float)
+    balance = Column(Float)
+    currency = Column(String(10))
+    fetch_date = Column(DateTime)
+
+    # Covering index for the home page sort (txn_date DESC)
+    __table_args__ = (
+        Index("ix_bill_listings_txn_date_covering",
+              "txn_date", "bill_id", "vendor_name", "total_amt", "balance", "currency", "fetch_date"),
+    )
+
+class CustomerListing(db.Model):
+    __tablename__ = "customer_listings"
+    # Clustered on the listing sort order; a covering secondary index over these
+    # string columns would exceed InnoDB's index key length limit.
+    display_name = Column(String(255), primary_key=True)
+    customer_id = Column(String(50), primary_key=True)
+    company_name = Column(String(255))
+    primary_email_addr = Column(String(255))
+    fetch_date = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_customer_listings_customer_id", "customer_id", unique=True),
+    )
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+from database import db
+
+class SyncState(db.Model):
+    __tablename__ = "sync_state"
+    __table_args__ = (UniqueConstraint("realm_id", "entity", name="uq_sync_state_realm_entity"),)
+    id = Column(Integer, primary_key=True, index=True)
+    realm_id = Column(String(50), nullable=False)
+    entity = Column(String(20), nullable=False)  # QuickBooks entity name, e.g. "Bill"
+    page_size = Column(Integer, nullable=False, default=1)
+    next_start_position = Column(Integer, nullable=False, default=1)  # First position not yet claimed
+    exhausted = Column(Boolean, nullable=False, default=False)  # A short page marked the end of the data
+    started_at = Column(DateTime, server_default=func.now())
+    completed_at = Column(DateTime)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    # Progress counters for the current job, reset when a sync starts
+    job_id = Column(String(36), index=True)
+    total_count = Column(Integer)  # Entity count reported by QuickBooks, when known
+    pages_fetched = Column(Integer, nullable=False, default=0)
+    records_fetched = Column(Integer, nullable=False, default=0)
+    api_seconds = Column(Float, nullable=False, default=0.0)
+    db_seconds = Column(Float, nullable=False, default=0.0)
+    last_api_seconds = Column(Float)
+    last_db_seconds = Column(Float)
+    recent_records_per_second = Column(Float)  # Moving average over recent pages
+    last_page_at = Column(DateTime)
+
+    leases = relationship("SyncLease", back_populates="sync_state", cascade="all, delete-orphan")
+
+class SyncLease(db.Model):
+    __tablename__ = "sync_leases"
+    id = Column(Integer, primary_key=True, index=True)
+    sync_state_id = Column(Integer, ForeignKey('sync_state.id'), nullable=False, index=True)
+    start_position = Column(Integer, nullable=False)
+    max_results = Column(Integer, nullable=False)
+    owner = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)  # Expired leases are handed out again
+
+    sync_state = relationship("SyncState", back_populates="leases")
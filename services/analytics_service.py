@@ -0,0 +1,141 @@
+import os
+import json
+import uuid
+import shutil
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import Config
+from services.snapshot_query import SNAPSHOT_POINTER, SNAPSHOT_VERSION_PREFIX
+
+# Column layout of each snapshot table. String columns are dictionary-encoded
+# into int32 codes (-1 for NULL) so every column is a fixed-width NumPy array
+# that can be memory-mapped.
+SNAPSHOT_COLUMNS = {
+    "bills": {
+        "id": "int64",
+        "txn_date": "datetime64[D]",
+        "due_date": "datetime64[D]",
+        "total_amt": "float64",
+        "balance": "float64",
+        "vendor": "dict",
+    },
+    "line_items": {
+        "bill_id": "int64",
+        "txn_date": "datetime64[D]",
+        "vendor": "dict",
+        "item_name": "dict",
+        "qty": "float64",
+        "unit_price": "float64",
+        "amount": "float64",
+    },
+}
+
+class SnapshotExporter:
+    """Write bills and line items to a columnar NumPy snapshot directory"""
+
+    def __init__(self, db: Session, root: str = None):
+        self.db = db
+        self.root = root or Config.ANALYTICS_SNAPSHOT_DIR
+
+    def _bill_rows(self):
+        # Imported here so the query side of the snapshot never touches the database module
+        from models.bill import Bill, Vendor
+
+        stmt = (
+            select(Bill.id, Bill.txn_date, Bill.due_date, Bill.total_amt, Bill.balance, Vendor.name)
+            .outerjoin(Vendor, Bill.vendor_id == Vendor.id)
+            .order_by(Bill.id)
+        )
+        return self.db.execute(stmt.execution_options(yield_per=5000))
+
+    def _line_item_rows(self):
+        from models.bill import Bill, Vendor, BillLineItem
+
+        stmt = (
+            select(BillLineItem.bill_id, Bill.txn_date, Vendor.name, BillLineItem.item_name,
+                   BillLineItem.qty, BillLineItem.unit_price, BillLineItem.amount)
+            .join(Bill, BillLineItem.bill_id == Bill.id)
+            .outerjoin(Vendor, Bill.vendor_id == Vendor.id)
+            .order_by(BillLineItem.id)
+        )
+        return self.db.execute(stmt.execution_options(yield_per=5000))
+
+    def export(self) -> dict:
+        """Export a fresh snapshot version and atomically point CURRENT at it.
+
+        Readers that resolved the previous version keep working: it is kept
+        until the export after this one.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        token = uuid.uuid4().hex
+        staging = os.path.join(self.root, f".tmp-{token}")
+
+        try:
+            counts = {
+                "bills": _write_table(os.path.join(staging, "bills"), SNAPSHOT_COLUMNS["bills"],
+                                      self._bill_rows()),
+                "line_items": _write_table(os.path.join(staging, "line_items"), SNAPSHOT_COLUMNS["line_items"],
+                                           self._line_item_rows()),
+            }
+            exported_at = datetime.utcnow()
+            with open(os.path.join(staging, "manifest.json"), "w") as f:
+                json.dump({"exported_at": exported_at.isoformat() + "Z", "rows": counts}, f)
+
+            # Sortable by export time, unique across concurrent exporters
+            version = f"{SNAPSHOT_VERSION_PREFIX}{exported_at.strftime('%Y%m%dT%H%M%S%f')}-{token[:8]}"
+            os.replace(staging, os.path.join(self.root, version))
+        finally:
+            if os.path.exists(staging):
+                shutil.rmtree(staging)
+
+        pointer = os.path.join(self.root, f".{SNAPSHOT_POINTER}-{token}")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.root, SNAPSHOT_POINTER))
+        self._prune(version)
+        return counts
+
+    def _prune(self, current: str):
+        """Remove versions older than the one ``current`` replaced"""
+        versions = sorted(name for name in os.listdir(self.root) if name.startswith(SNAPSHOT_VERSION_PREFIX))
+        older = [name for name in versions if name < current]
+        for name in older[:-1]:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+def _write_table(path: str, columns: dict, rows) -> int:
+    names = list(columns)
+    values = {name: [] for name in names}
+    for row in rows:
+        for name, value in zip(names, row):
+            values[name].append(value)
+
+    os.makedirs(path, exist_ok=True)
+    dictionaries = {}
+    for name, dtype in columns.items():
+        if dtype == "dict":
+            codes, labels = _dictionary_encode(values[name])
+            dictionaries[name] = labels
+            array = codes
+        elif dtype.startswith("datetime64"):
+            array = np.array([v if v is not None else "NaT" for v in values[name]], dtype=dtype)
+        elif dtype == "float64":
+            array = np.array([v if v is not None else np.nan for v in values[name]], dtype=dtype)
+        else:
+            array = np.array([v if v is not None else -1 for v in values[name]], dtype=dtype)
+        np.save(os.path.join(path, f"{name}.npy"), array)
+
+    with open(os.path.join(path, "dictionaries.json"), "w") as f:
+        json.dump(dictionaries, f)
+    return len(values[names[0]])
+
+def _dictionary_encode(values):
+    index = {}
+    codes = np.empty(len(values), dtype="int32")
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = -1
+        else:
+            codes[i] = index.setdefault(value, len(index))
+    return codes, list(index)
@@ -0,0 +1,105 @@
+import os
+import gzip
+import json
+import zlib
+import uuid
+import logging
+import threading
+from datetime import datetime
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Segments opened by this process, keyed by (pid, root, realm_id, entity).
+# Archives are created per request, so this is how consecutive pages end up in
+# the same segment. Files found on disk are never reused: after a crash a
+# restarted process may get the same pid and would append after a torn member.
+_open_segments = {}
+_open_segments_lock = threading.Lock()
+# Distinguishes this process's segments from those of an earlier process that
+# had the same pid (forked workers share it, so the pid stays in the name too)
+_PROCESS_TOKEN = uuid.uuid4().hex[:8]
+
+class PayloadArchive:
+    """Append-only, gzip-compressed archive of raw QuickBooks query pages.
+
+    Pages are written as JSON lines to segment files laid out as
+    ``<root>/<realm_id>/<entity>/<segment>.jsonl.gz``. Every page is appended
+    as its own gzip member and a segment is only ever appended to by the
+    process that created it, so a write torn by a crash loses at most the
+    pages after it in that one segment. A new segment is started once the
+    current one grows past ``segment_max_bytes``.
+    """
+
+    SEGMENT_SUFFIX = ".jsonl.gz"
+
+    def __init__(self, root: str = None, segment_max_bytes: int = None):
+        self.root = root or Config.ARCHIVE_DIR
+        self.segment_max_bytes = segment_max_bytes or Config.ARCHIVE_SEGMENT_MAX_BYTES
+
+    def _entity_dir(self, realm_id: str, entity: str) -> str:
+        return os.path.join(self.root, str(realm_id), entity)
+
+    def _new_segment_path(self, realm_id: str, entity: str) -> str:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        name = f"{stamp}-{os.getpid()}-{_PROCESS_TOKEN}{self.SEGMENT_SUFFIX}"
+        return os.path.join(self._entity_dir(realm_id, entity), name)
+
+    def _segment_for(self, realm_id: str, entity: str) -> str:
+        key = (os.getpid(), self.root, str(realm_id), entity)
+        with _open_segments_lock:
+            path = _open_segments.get(key)
+            if path is None or (os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes):
+                os.makedirs(self._entity_dir(realm_id, entity), exist_ok=True)
+                path = self._new_segment_path(realm_id, entity)
+                _open_segments[key] = path
+            return path
+
+    def append(self, entity: str, realm_id: str, start_position: int, max_results: int, records: list):
+        """Archive one fetched page of raw QuickBooks records"""
+        page = {
+            "entity": entity,
+            "realm_id": str(realm_id),
+            "start_position": start_position,
+            "max_results": max_results,
+            "fetched_at": datetime.utcnow().isoformat() + "Z",
+            "records": records
+        }
+        line = json.dumps(page, separators=(",", ":")) + "\n"
+        with gzip.open(self._segment_for(realm_id, entity), "ab") as f:
+            f.write(line.encode("utf-8"))
+
+    def segments(self, entity: str, realm_id: str = None) -> list:
+        """List segment files for an entity in write order"""
+        realms = [str(realm_id)] if realm_id else (
+            sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        )
+        paths = []
+        for realm in realms:
+            entity_dir = self._entity_dir(realm, entity)
+            if not os.path.isdir(entity_dir):
+                continue
+            paths.extend(
+                os.path.join(entity_dir, name)
+                for name in sorted(os.listdir(entity_dir))
+                if name.endswith(self.SEGMENT_SUFFIX)
+            )
+        return paths
+
+    def iter_pages(self, entity: str, realm_id: str = None):
+        """Yield archived pages for an entity, oldest first.
+
+        A segment with a torn or corrupt gzip member is read up to that member
+        and the rest of it is skipped with a warning.
+        """
+        for path in self.segments(entity, realm_id):
+            pages = 0
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                try:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+                            pages += 1
+                except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+                    logger.warning(f"Archive segment {path} is damaged after page {pages} ({e}); "
+                                   f"skipping the rest of it")
@@ -1,8 +1,10 @@
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from models.base import Base
-from models.bill import Bill
+from models.bill import Bill, Vendor, Currency
 from models.customer import Customer
 from models.fetch_settings import FetchSettings
+from models.listing import BillListing, CustomerListing
 
 class DataService:
     def __init__(self, db: Session):
@@ -18,7 +20,7 @@ class DataService:
     
     def truncate_tables(self, tables=None):
         if tables is None:
-            tables = [Bill, Customer]  # Add other tables as needed
+            tables = [Bill, Customer, BillListing, CustomerListing]  # Add other tables as needed
             
         for table in tables:
             try:
@@ -28,6 +30,28 @@ class DataService:
                 self.db.rollback()
                 raise Exception(f"Failed to truncate table {table.__name__}: {str(e)}")
     
+    def rebuild_listings(self):
+        """Repopulate the listing read models from the normalized tables"""
+        try:
+            self.db.query(BillListing).delete()
+            self.db.execute(BillListing.__table__.insert().from_select(
+                ["bill_id", "txn_date", "vendor_name", "total_amt", "balance", "currency", "fetch_date"],
+                select(Bill.bill_id, Bill.txn_date, Vendor.name, Bill.total_amt, Bill.balance,
+                       Currency.value, Bill.fetch_date)
+                .outerjoin(Vendor, Bill.vendor_id == Vendor.id)
+                .outerjoin(Currency, Bill.currency_id == Currency.id)
+            ))
+            self.db.query(CustomerListing).delete()
+            self.db.execute(CustomerListing.__table__.insert().from_select(
+                ["display_name", "customer_id", "company_name", "primary_email_addr", "fetch_date"],
+                select(func.coalesce(Customer.display_name, ""), Customer.customer_id, Customer.company_name,
+                       Customer.primary_email_addr, Customer.fetch_date)
+            ))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            raise Exception(f"Failed to rebuild listings: {str(e)}")
+    
     def get_bills_by_date(self, from_date):
         return self.db.query(Bill).filter(Bill.txn_date >= from_date).all()
     
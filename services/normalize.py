@@ -0,0 +1,251 @@
+"""Normalization of raw QuickBooks payloads into flat, typed records.
+
+This stage does all the parsing that ``QBOService.process_bills`` and
+``process_customers`` need (dates, timestamps, amounts and nested lookups)
+in one pass over a page, with no database access, so its CPU cost can be
+measured separately from DB I/O. Run it on its own with::
+
+    python -m services.normalize --archive-dir archive --profile
+"""
+import time
+import argparse
+import cProfile
+import pstats
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+class NormalizedLineItem(NamedTuple):
+    line_num: Optional[int]
+    description: Optional[str]
+    amount: float
+    item_ref: Optional[str]
+    item_name: Optional[str]
+    qty: int  # BillLineItem.qty is an Integer column
+    unit_price: float
+
+class NormalizedVendorAddr(NamedTuple):
+    line1: Optional[str]
+    city: Optional[str]
+    country_sub_division_code: Optional[str]
+    postal_code: Optional[str]
+
+class NormalizedBillAddr(NamedTuple):
+    qb_address_id: Optional[str]
+    line1: Optional[str]
+    city: Optional[str]
+    country_sub_division_code: Optional[str]
+    postal_code: Optional[str]
+    lat: Optional[str]
+    lon: Optional[str]
+
+class NormalizedBill(NamedTuple):
+    bill_id: str
+    vendor_ref: Optional[str]
+    vendor_name: Optional[str]
+    vendor_addr: Optional[NormalizedVendorAddr]
+    currency_code: Optional[str]
+    currency_name: Optional[str]
+    txn_date: Optional[datetime]
+    due_date: Optional[datetime]
+    total_amt: float
+    balance: float
+    create_time: Optional[datetime]
+    last_updated_time: Optional[datetime]
+    line_items: Tuple[NormalizedLineItem, ...]
+
+class NormalizedCustomer(NamedTuple):
+    customer_id: str
+    sync_token: Optional[str]
+    domain: Optional[str]
+    given_name: Optional[str]
+    display_name: Optional[str]
+    bill_with_parent: bool
+    fully_qualified_name: Optional[str]
+    company_name: Optional[str]
+    family_name: Optional[str]
+    sparse: bool
+    primary_phone_free_form_number: Optional[str]
+    primary_email_addr: Optional[str]
+    active: bool
+    job: bool
+    balance_with_jobs: float
+    preferred_delivery_method: Optional[str]
+    taxable: bool
+    print_on_check_name: Optional[str]
+    balance: float
+    bill_addr: Optional[NormalizedBillAddr]
+    has_metadata: bool
+    create_time: Optional[datetime]
+    last_updated_time: Optional[datetime]
+
+_EMPTY = {}
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> datetime:
+    """Parse a QuickBooks ``YYYY-MM-DD`` date; pages repeat the same few dates"""
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a QuickBooks ISO 8601 timestamp, accepting a ``Z`` suffix.
+
+    Not memoized: timestamps are nearly all distinct, so a cache would only
+    add lookup overhead and hold on to every value it has seen.
+    """
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def normalize_bills(bills_data) -> list:
+    """Flatten a page of raw Bill payloads; records without an Id are dropped"""
+    records = []
+    append = records.append
+    for b in bills_data:
+        bill_id = b.get("Id")
+        if not bill_id:
+            continue
+
+        vendor_ref = b.get("VendorRef") or _EMPTY
+        vendor_addr = b.get("VendorAddr")
+        currency = b.get("CurrencyRef") or _EMPTY
+        metadata = b.get("MetaData") or _EMPTY
+        txn_date = b.get("TxnDate")
+        due_date = b.get("DueDate")
+        create_time = metadata.get("CreateTime")
+        last_updated_time = metadata.get("LastUpdatedTime")
+
+        line_items = []
+        for line in b.get("Line") or ():
+            detail = line.get("ItemBasedExpenseLineDetail") or _EMPTY
+            item_ref = detail.get("ItemRef") or _EMPTY
+            line_items.append(NormalizedLineItem(
+                line.get("LineNum"),
+                line.get("Description"),
+                float(line.get("Amount", 0)),
+                item_ref.get("value"),
+                item_ref.get("name"),
+                round(float(detail.get("Qty", 0))),
+                float(detail.get("UnitPrice", 0)),
+            ))
+
+        append(NormalizedBill(
+            bill_id,
+            vendor_ref.get("value"),
+            vendor_ref.get("name"),
+            NormalizedVendorAddr(
+                vendor_addr.get("Line1"), vendor_addr.get("City"), vendor_addr.get("CountrySubDivisionCode"),
+                vendor_addr.get("PostalCode"),
+            ) if vendor_addr else None,
+            currency.get("value"),
+            currency.get("name"),
+            parse_date(txn_date) if txn_date else None,
+            parse_date(due_date) if due_date else None,
+            float(b.get("TotalAmt", 0)),
+            float(b.get("Balance", 0)),
+            parse_timestamp(create_time) if create_time else None,
+            parse_timestamp(last_updated_time) if last_updated_time else None,
+            tuple(line_items),
+        ))
+    return records
+
+def normalize_customers(customers_data) -> list:
+    """Flatten a page of raw Customer payloads; records without an Id are dropped"""
+    records = []
+    append = records.append
+    for c in customers_data:
+        customer_id = c.get("Id")
+        if not customer_id:
+            continue
+
+        bill_addr = c.get("BillAddr")
+        metadata = c.get("MetaData")
+        create_time = metadata.get("CreateTime") if metadata else None
+        last_updated_time = metadata.get("LastUpdatedTime") if metadata else None
+
+        append(NormalizedCustomer(
+            customer_id,
+            c.get("SyncToken"),
+            c.get("domain"),
+            c.get("GivenName"),
+            c.get("DisplayName"),
+            c.get("BillWithParent", False),
+            c.get("FullyQualifiedName"),
+            c.get("CompanyName"),
+            c.get("FamilyName"),
+            c.get("sparse", False),
+            (c.get("PrimaryPhone") or _EMPTY).get("FreeFormNumber"),
+            (c.get("PrimaryEmailAddr") or _EMPTY).get("Address"),
+            c.get("Active", True),
+            c.get("Job", False),
+            float(c.get("BalanceWithJobs", 0)),
+            c.get("PreferredDeliveryMethod"),
+            c.get("Taxable", False),
+            c.get("PrintOnCheckName"),
+            float(c.get("Balance", 0)),
+            NormalizedBillAddr(
+                bill_addr.get("Id"), bill_addr.get("Line1"), bill_addr.get("City"),
+                bill_addr.get("CountrySubDivisionCode"), bill_addr.get("PostalCode"),
+                bill_addr.get("Lat"), bill_addr.get("Lon"),
+            ) if bill_addr else None,
+            bool(metadata),
+            parse_timestamp(create_time) if create_time else None,
+            parse_timestamp(last_updated_time) if last_updated_time else None,
+        ))
+    return records
+
+NORMALIZERS = {"Bill": normalize_bills, "Customer": normalize_customers}
+
+def benchmark(pages: dict, repeat: int = 5) -> dict:
+    """Time the normalizers over ``{entity: [page records, ...]}``, best of ``repeat`` runs"""
+    results = {}
+    for entity, entity_pages in pages.items():
+        normalize = NORMALIZERS[entity]
+        records = sum(len(page) for page in entity_pages)
+        best = None
+        for _ in range(repeat):
+            parse_date.cache_clear()
+            started = time.perf_counter()
+            for page in entity_pages:
+                normalize(page)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[entity] = {
+            "pages": len(entity_pages),
+            "records": records,
+            "seconds": best,
+            "records_per_second": records / best if best else None,
+        }
+    return results
+
+def main(argv=None):
+    from services.archive_service import PayloadArchive
+
+    parser = argparse.ArgumentParser(description="Benchmark payload normalization on archived pages.")
+    parser.add_argument("--archive-dir", default=None, help="Archive root (defaults to Config.ARCHIVE_DIR).")
+    parser.add_argument("--realm-id", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profile", action="store_true", help="Also print a cProfile of one pass.")
+    args = parser.parse_args(argv)
+
+    archive = PayloadArchive(root=args.archive_dir)
+    pages = {
+        entity: [page["records"] for page in archive.iter_pages(entity, args.realm_id)]
+        for entity in NORMALIZERS
+    }
+    if not any(pages.values()):
+        parser.error(f"No archived pages found under {archive.root}")
+
+    for entity, stats in benchmark(pages, args.repeat).items():
+        rate = f"{stats['records_per_second']:.0f} records/s" if stats["records_per_second"] else "-"
+        print(f"{entity}: {stats['records']} records in {stats['pages']} pages, "
+              f"best {stats['seconds'] * 1000:.1f} ms ({rate})")
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        for entity, entity_pages in pages.items():
+            for page in entity_pages:
+                NORMALIZERS[entity](page)
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+if __name__ == "__main__":
+    main()
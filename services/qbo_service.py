@@ -1,3 +1,4 @@
+import time
 import requests
 from datetime import datetime
 from sqlalchemy.orm import Session
@@ -5,11 +6,26 @@ from config import Config
 from utils.auth import get_auth_headers
 from models.bill import Bill, Vendor, VendorAddress, Currency, BillMetaData, BillLineItem
 from models.customer import Customer, CustomerAddress, CustomerMetaData
+from models.listing import BillListing, CustomerListing
+from services.archive_service import PayloadArchive
+from services.normalize import normalize_bills, normalize_customers
 
 class QBOService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, archive: PayloadArchive = None, archive_enabled: bool = None):
+        # Fetched pages go to ``archive`` if given, else to a default
+        # PayloadArchive when Config.ARCHIVE_ENABLED is set. archive_enabled
+        # overrides both; False turns archiving off entirely.
         self.db = db
         self.config = Config()
+        if archive_enabled is None:
+            archive_enabled = archive is not None or self.config.ARCHIVE_ENABLED
+        if archive is None and archive_enabled:
+            archive = PayloadArchive()
+        self.archive = archive if archive_enabled else None
+        self.chunk_size = self.config.INGEST_CHUNK_SIZE
+        self.peak_session_size = 0
+        self.normalize_seconds = 0.0  # CPU time spent in the normalization stage
+        self._pending_records = 0
         
     def fetch_bills(self, start_position: int, max_results: int, access_token: str):
         url = f"{self.config.API_BASE_URL}/{self.config.REALM_ID}/query"
@@ -19,9 +35,13 @@ class QBOService:
         try:
             response = requests.post(url, headers=headers, data=query)
             response.raise_for_status()
-            return response.json().get("QueryResponse", {}).get("Bill", [])
+            records = response.json().get("QueryResponse", {}).get("Bill", [])
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to fetch bills: {str(e)}")
+
+        if self.archive and records:
+            self.archive.append("Bill", self.config.REALM_ID, start_position, max_results, records)
+        return records
     
     def fetch_customers(self, start_position: int, max_results: int, access_token: str):
         url = f"{self.config.API_BASE_URL}/{self.config.REALM_ID}/query"
@@ -31,190 +51,292 @@ class QBOService:
         try:
             response = requests.post(url, headers=headers, data=query)
             response.raise_for_status()
-            return response.json().get("QueryResponse", {}).get("Customer", [])
+            records = response.json().get("QueryResponse", {}).get("Customer", [])
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to fetch customers: {str(e)}")
+
+        if self.archive and records:
+            self.archive.append("Customer", self.config.REALM_ID, start_position, max_results, records)
+        return records
     
+    def fetch_count(self, entity: str, access_token: str) -> int:
+        """Total number of ``entity`` records in the realm"""
+        url = f"{self.config.API_BASE_URL}/{self.config.REALM_ID}/query"
+        headers = get_auth_headers(access_token)
+        query = f"SELECT COUNT(*) FROM {entity}"
+        
+        try:
+            response = requests.post(url, headers=headers, data=query)
+            response.raise_for_status()
+            return response.json().get("QueryResponse", {}).get("totalCount")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Failed to count {entity.lower()}s: {str(e)}")
+
+    def fetch_batch(self, page_requests, access_token: str):
+        """Run several page queries through the QBO /batch endpoint.
+
+        ``page_requests`` is a list of ``(entity, start_position, max_results)``.
+        Returns one result dict per request, in the same order, carrying either
+        ``records`` or a ``fault`` message so callers can handle partial failures.
+        """
+        url = f"{self.config.API_BASE_URL}/{self.config.REALM_ID}/batch"
+        headers = get_auth_headers(access_token)
+        headers["Content-Type"] = "application/json"
+
+        results = []
+        max_items = self.config.QBO_BATCH_MAX_ITEMS
+        for offset in range(0, len(page_requests), max_items):
+            chunk = page_requests[offset:offset + max_items]
+            payload = {
+                "BatchItemRequest": [
+                    {
+                        "bId": str(i),
+                        "Query": f"SELECT * FROM {entity} STARTPOSITION {start} MAXRESULTS {count}"
+                    }
+                    for i, (entity, start, count) in enumerate(chunk)
+                ]
+            }
+
+            try:
+                response = requests.post(url, headers=headers, json=payload)
+                response.raise_for_status()
+                items = response.json().get("BatchItemResponse", [])
+            except requests.exceptions.RequestException as e:
+                raise Exception(f"Failed to fetch batch: {str(e)}")
+
+            by_id = {item.get("bId"): item for item in items}
+            for i, (entity, start, count) in enumerate(chunk):
+                result = {"entity": entity, "start_position": start, "max_results": count,
+                          "records": None, "fault": None}
+                item = by_id.get(str(i))
+                if item is None:
+                    result["fault"] = "No response for batch item"
+                elif "Fault" in item:
+                    errors = item["Fault"].get("Error", [])
+                    result["fault"] = "; ".join(
+                        e.get("Message") or e.get("Detail") or "Unknown error" for e in errors
+                    ) or "Unknown error"
+                else:
+                    result["records"] = item.get("QueryResponse", {}).get(entity, [])
+                    if self.archive and result["records"]:
+                        self.archive.append(entity, self.config.REALM_ID, start, count, result["records"])
+                results.append(result)
+        return results
+
+    def replay_archive(self, archive: PayloadArchive, entities=("Bill", "Customer"), realm_id: str = None):
+        """Feed archived pages through the processors without touching the API"""
+        processors = {"Bill": self.process_bills, "Customer": self.process_customers}
+        counts = {}
+        for entity in entities:
+            pages = records = 0
+            for page in archive.iter_pages(entity, realm_id):
+                processors[entity](page["records"])
+                self.db.commit()
+                pages += 1
+                records += len(page["records"])
+            counts[entity] = {"pages": pages, "records": records}
+        return counts
+
+    def _session_size(self) -> int:
+        return len(self.db.identity_map) + len(self.db.new)
+
+    def _record_processed(self):
+        """Count a processed record and commit once a full chunk is pending"""
+        self._pending_records += 1
+        if self.chunk_size and self._pending_records >= self.chunk_size:
+            self._commit_chunk()
+
+    def _commit_chunk(self):
+        """Commit pending work and drop every object from the session.
+
+        Keeps the identity map bounded by the chunk size rather than the page
+        or sync size. Objects loaded before this call are detached afterwards.
+        """
+        self.peak_session_size = max(self.peak_session_size, self._session_size())
+        if not self.chunk_size:
+            return
+        self.db.commit()
+        self.db.expunge_all()
+        self._pending_records = 0
+
     def process_bills(self, bills_data):
         current_time = datetime.utcnow()
-        for b in bills_data:
-            qb_bill_id_str = b.get("Id")
-            if not qb_bill_id_str:
-                continue
+        started = time.perf_counter()
+        records = normalize_bills(bills_data)
+        self.normalize_seconds += time.perf_counter() - started
 
+        for b in records:
             # Process Vendor
-            vendor_ref = b.get("VendorRef", {})
-            vendor_name = vendor_ref.get("name")
-            vendor_qb_id = vendor_ref.get("value")
-            vendor = self.db.query(Vendor).filter(Vendor.vendor_ref == vendor_qb_id).first()
-            if not vendor and vendor_name and vendor_qb_id:
-                vendor = Vendor(name=vendor_name, vendor_ref=vendor_qb_id)
+            vendor = self.db.query(Vendor).filter(Vendor.vendor_ref == b.vendor_ref).first()
+            if not vendor and b.vendor_name and b.vendor_ref:
+                vendor = Vendor(name=b.vendor_name, vendor_ref=b.vendor_ref)
                 self.db.add(vendor)
                 self.db.flush()
 
             # Process Vendor Address
-            if vendor: 
-                vendor_addr_data = b.get("VendorAddr")
-                if vendor_addr_data:
-                    address = self.db.query(VendorAddress).filter(VendorAddress.vendor_id == vendor.id).first()
-                    if not address:
-                        address = VendorAddress(vendor_id=vendor.id)
-                        self.db.add(address)
-                    address.line1 = vendor_addr_data.get("Line1")
-                    address.city = vendor_addr_data.get("City")
-                    address.country_sub_division_code = vendor_addr_data.get("CountrySubDivisionCode")
-                    address.postal_code = vendor_addr_data.get("PostalCode")
+            if vendor and b.vendor_addr:
+                address = self.db.query(VendorAddress).filter(VendorAddress.vendor_id == vendor.id).first()
+                if not address:
+                    address = VendorAddress(vendor_id=vendor.id)
+                    self.db.add(address)
+                address.line1 = b.vendor_addr.line1
+                address.city = b.vendor_addr.city
+                address.country_sub_division_code = b.vendor_addr.country_sub_division_code
+                address.postal_code = b.vendor_addr.postal_code
 
             # Process Currency
             currency = None
-            currency_data = b.get("CurrencyRef", {})
-            currency_code = currency_data.get("value")
-            if currency_code:
-                currency = self.db.query(Currency).filter(Currency.value == currency_code).first()
+            if b.currency_code:
+                currency = self.db.query(Currency).filter(Currency.value == b.currency_code).first()
                 if not currency:
-                    currency = Currency(value=currency_code, name=currency_data.get("name"))
+                    currency = Currency(value=b.currency_code, name=b.currency_name)
                     self.db.add(currency)
                     self.db.flush()
 
             # Process Bill
-            bill = self.db.query(Bill).filter(Bill.bill_id == qb_bill_id_str).first()
-
-            txn_date_str = b.get("TxnDate")
-            due_date_str = b.get("DueDate")
-            total_amt = float(b.get("TotalAmt", 0))
-            balance = float(b.get("Balance", 0))
-            
-            parsed_txn_date = datetime.strptime(txn_date_str, "%Y-%m-%d") if txn_date_str else None
-            parsed_due_date = datetime.strptime(due_date_str, "%Y-%m-%d") if due_date_str else None
-
-            # Process Metadata
-            metadata_data = b.get("MetaData", {})
-            create_time_str = metadata_data.get("CreateTime")
-            last_updated_time_str = metadata_data.get("LastUpdatedTime")
-            parsed_create_time = datetime.fromisoformat(create_time_str.replace("Z", "+00:00")) if create_time_str else None
-            parsed_last_updated_time = datetime.fromisoformat(last_updated_time_str.replace("Z", "+00:00")) if last_updated_time_str else None
+            bill = self.db.query(Bill).filter(Bill.bill_id == b.bill_id).first()
 
             if not bill:
                 bill = Bill(
-                    bill_id=qb_bill_id_str,
-                    txn_date=parsed_txn_date,
-                    due_date=parsed_due_date,
-                    total_amt=total_amt,
-                    balance=balance,
+                    bill_id=b.bill_id,
+                    txn_date=b.txn_date,
+                    due_date=b.due_date,
+                    total_amt=b.total_amt,
+                    balance=b.balance,
                     vendor_id=vendor.id if vendor else None,
                     currency_id=currency.id if currency else None,
                     fetch_date=current_time
                 )
                 self.db.add(bill)
                 bill_meta = BillMetaData(
-                    create_time=parsed_create_time,
-                    last_updated_time=parsed_last_updated_time
+                    create_time=b.create_time,
+                    last_updated_time=b.last_updated_time
                 )
                 bill.bill_metadata = bill_meta
             else:
-                bill.txn_date = parsed_txn_date if parsed_txn_date else bill.txn_date
-                bill.due_date = parsed_due_date if parsed_due_date else bill.due_date
-                bill.total_amt = total_amt
-                bill.balance = balance
+                bill.txn_date = b.txn_date if b.txn_date else bill.txn_date
+                bill.due_date = b.due_date if b.due_date else bill.due_date
+                bill.total_amt = b.total_amt
+                bill.balance = b.balance
                 bill.vendor_id = vendor.id if vendor else bill.vendor_id
                 bill.currency_id = currency.id if currency else bill.currency_id
                 bill.fetch_date = current_time
 
                 if bill.bill_metadata:
-                    bill.bill_metadata.create_time = parsed_create_time if parsed_create_time else bill.bill_metadata.create_time
-                    bill.bill_metadata.last_updated_time = parsed_last_updated_time if parsed_last_updated_time else bill.bill_metadata.last_updated_time
-                elif parsed_create_time or parsed_last_updated_time: 
+                    bill.bill_metadata.create_time = b.create_time if b.create_time else bill.bill_metadata.create_time
+                    bill.bill_metadata.last_updated_time = b.last_updated_time if b.last_updated_time else bill.bill_metadata.last_updated_time
+                elif b.create_time or b.last_updated_time: 
                     bill_meta = BillMetaData(
-                        create_time=parsed_create_time,
-                        last_updated_time=parsed_last_updated_time
+                        create_time=b.create_time,
+                        last_updated_time=b.last_updated_time
                     )
                     bill.bill_metadata = bill_meta
 
+            # Process Listing
+            listing = self.db.get(BillListing, b.bill_id)
+            if not listing:
+                listing = BillListing(bill_id=b.bill_id)
+                self.db.add(listing)
+            listing.txn_date = bill.txn_date
+            listing.total_amt = bill.total_amt
+            listing.balance = bill.balance
+            listing.vendor_name = vendor.name if vendor else listing.vendor_name
+            listing.currency = currency.value if currency else listing.currency
+            listing.fetch_date = bill.fetch_date
+
             # Process Line Items
-            line_items_data = b.get("Line", [])
-            for line_item_data in line_items_data:
-                self._process_line_item(bill, line_item_data)
+            self._replace_line_items(bill, b.line_items)
+
+            self._record_processed()
+        self._commit_chunk()
     
-    def _process_line_item(self, bill, line_item_data):
-        line_num = line_item_data.get("LineNum")
-        amount = float(line_item_data.get("Amount", 0))
-        description = line_item_data.get("Description")
-        
-        item_based_expense_line_detail = line_item_data.get("ItemBasedExpenseLineDetail", {})
-        item_ref = item_based_expense_line_detail.get("ItemRef", {}).get("value")
-        item_name = item_based_expense_line_detail.get("ItemRef", {}).get("name")
-        qty = item_based_expense_line_detail.get("Qty", 0)
-        unit_price = float(item_based_expense_line_detail.get("UnitPrice", 0))
-        
-        line_item = BillLineItem(
-            bill_id=bill.id,
-            line_num=line_num,
-            description=description,
-            amount=amount,
-            item_name=item_name,
-            item_ref=item_ref,
-            qty=qty,
-            unit_price=unit_price
-        )
-        self.db.add(line_item)
+    def _replace_line_items(self, bill, line_items):
+        """Replace the bill's line items, so re-processing a bill never duplicates them.
+
+        Chunked commits mean a retried page can re-process bills that were
+        already committed; this keeps that idempotent.
+        """
+        if bill.id is not None:
+            self.db.query(BillLineItem).filter(BillLineItem.bill_id == bill.id).delete(synchronize_session=False)
+            self.db.expire(bill, ["line_items"])
+        for line_item in line_items:
+            self._process_line_item(bill, line_item)
+
+    def _process_line_item(self, bill, line_item):
+        self.db.add(BillLineItem(
+            bill=bill,
+            line_num=line_item.line_num,
+            description=line_item.description,
+            amount=line_item.amount,
+            item_name=line_item.item_name,
+            item_ref=line_item.item_ref,
+            qty=line_item.qty,
+            unit_price=line_item.unit_price
+        ))
     
     def process_customers(self, customers_data):
         current_time = datetime.utcnow()
-        for c_data in customers_data:
-            qb_customer_id = c_data.get("Id")
-            if not qb_customer_id:
-                continue
+        started = time.perf_counter()
+        records = normalize_customers(customers_data)
+        self.normalize_seconds += time.perf_counter() - started
 
-            customer = self.db.query(Customer).filter(Customer.customer_id == qb_customer_id).first()
+        for c in records:
+            customer = self.db.query(Customer).filter(Customer.customer_id == c.customer_id).first()
 
             if not customer:
-                customer = Customer(customer_id=qb_customer_id)
+                customer = Customer(customer_id=c.customer_id)
                 self.db.add(customer)
             
             # Update customer fields
-            customer.sync_token = c_data.get("SyncToken")
-            customer.domain = c_data.get("domain")
-            customer.given_name = c_data.get("GivenName")
-            customer.display_name = c_data.get("DisplayName")
-            customer.bill_with_parent = c_data.get("BillWithParent", False)
-            customer.fully_qualified_name = c_data.get("FullyQualifiedName")
-            customer.company_name = c_data.get("CompanyName")
-            customer.family_name = c_data.get("FamilyName")
-            customer.sparse = c_data.get("sparse", False)
-            customer.primary_phone_free_form_number = c_data.get("PrimaryPhone", {}).get("FreeFormNumber")
-            customer.primary_email_addr = c_data.get("PrimaryEmailAddr", {}).get("Address")
-            customer.active = c_data.get("Active", True)
-            customer.job = c_data.get("Job", False)
-            customer.balance_with_jobs = float(c_data.get("BalanceWithJobs", 0))
-            customer.preferred_delivery_method = c_data.get("PreferredDeliveryMethod")
-            customer.taxable = c_data.get("Taxable", False)
-            customer.print_on_check_name = c_data.get("PrintOnCheckName")
-            customer.balance = float(c_data.get("Balance", 0))
+            customer.sync_token = c.sync_token
+            customer.domain = c.domain
+            customer.given_name = c.given_name
+            customer.display_name = c.display_name
+            customer.bill_with_parent = c.bill_with_parent
+            customer.fully_qualified_name = c.fully_qualified_name
+            customer.company_name = c.company_name
+            customer.family_name = c.family_name
+            customer.sparse = c.sparse
+            customer.primary_phone_free_form_number = c.primary_phone_free_form_number
+            customer.primary_email_addr = c.primary_email_addr
+            customer.active = c.active
+            customer.job = c.job
+            customer.balance_with_jobs = c.balance_with_jobs
+            customer.preferred_delivery_method = c.preferred_delivery_method
+            customer.taxable = c.taxable
+            customer.print_on_check_name = c.print_on_check_name
+            customer.balance = c.balance
             customer.fetch_date = current_time
 
 
             # Process Address
-            bill_addr_data = c_data.get("BillAddr")
-            if bill_addr_data:
+            if c.bill_addr:
                 if not customer.bill_addr:
-                    customer.bill_addr = CustomerAddress(qb_address_id=bill_addr_data.get("Id"))
+                    customer.bill_addr = CustomerAddress(qb_address_id=c.bill_addr.qb_address_id)
                 
-                customer.bill_addr.line1 = bill_addr_data.get("Line1")
-                customer.bill_addr.city = bill_addr_data.get("City")
-                customer.bill_addr.country_sub_division_code = bill_addr_data.get("CountrySubDivisionCode")
-                customer.bill_addr.postal_code = bill_addr_data.get("PostalCode")
-                customer.bill_addr.lat = bill_addr_data.get("Lat")
-                customer.bill_addr.lon = bill_addr_data.get("Lon")
+                customer.bill_addr.line1 = c.bill_addr.line1
+                customer.bill_addr.city = c.bill_addr.city
+                customer.bill_addr.country_sub_division_code = c.bill_addr.country_sub_division_code
+                customer.bill_addr.postal_code = c.bill_addr.postal_code
+                customer.bill_addr.lat = c.bill_addr.lat
+                customer.bill_addr.lon = c.bill_addr.lon
 
             # Process Metadata
-            meta_data_json = c_data.get("MetaData")
-            if meta_data_json:
-                create_time_str = meta_data_json.get("CreateTime")
-                last_updated_time_str = meta_data_json.get("LastUpdatedTime")
-                parsed_create_time = datetime.fromisoformat(create_time_str.replace("Z", "+00:00")) if create_time_str else None
-                parsed_last_updated_time = datetime.fromisoformat(last_updated_time_str.replace("Z", "+00:00")) if last_updated_time_str else None
-
+            if c.has_metadata:
                 if not customer.customer_metadata_info:
                     customer.customer_metadata_info = CustomerMetaData()
-                customer.customer_metadata_info.create_time = parsed_create_time
-                customer.customer_metadata_info.last_updated_time = parsed_last_updated_time
\ No newline at end of file
+                customer.customer_metadata_info.create_time = c.create_time
+                customer.customer_metadata_info.last_updated_time = c.last_updated_time
+
+            # Process Listing
+            listing = self.db.query(CustomerListing).filter(CustomerListing.customer_id == c.customer_id).first()
+            if not listing:
+                listing = CustomerListing(customer_id=c.customer_id)
+                self.db.add(listing)
+            listing.display_name = customer.display_name or ""
+            listing.company_name = customer.company_name
+            listing.primary_email_addr = customer.primary_email_addr
+            listing.fetch_date = customer.fetch_date
+
+            self._record_processed()
+        self._commit_chunk()
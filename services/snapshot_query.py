@@ -0,0 +1,73 @@
+import os
+import json
+import numpy as np
+from config import Config
+
+# Kept apart from analytics_service so reading a snapshot never imports the
+# models, and therefore never connects to (or truncates) the database.
+
+# Each export is a ``<root>/v-<stamp>-<token>`` directory; the CURRENT file in
+# the root names the latest one and is swapped atomically.
+SNAPSHOT_POINTER = "CURRENT"
+SNAPSHOT_VERSION_PREFIX = "v-"
+
+class SnapshotQuery:
+    """Vectorized queries over memory-mapped snapshot columns.
+
+    The snapshot version is resolved once, so every column a query reads comes
+    from the same export even if a new one is swapped in meanwhile.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or Config.ANALYTICS_SNAPSHOT_DIR
+        self.path = _current_version(self.root)
+        self._dictionaries = {}
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, table, f"{name}.npy"), mmap_mode="r")
+
+    def labels(self, table: str, name: str) -> list:
+        if table not in self._dictionaries:
+            with open(os.path.join(self.path, table, "dictionaries.json")) as f:
+                self._dictionaries[table] = json.load(f)
+        return self._dictionaries[table][name]
+
+    def group_sum(self, table: str, key: str, value: str, top: int = None) -> list:
+        """Sum ``value`` per label of the dictionary-encoded ``key`` column, largest first"""
+        codes = self.column(table, key)
+        values = np.asarray(self.column(table, value))
+        mask = (codes >= 0) & ~np.isnan(values)
+        labels = self.labels(table, key)
+        sums = np.bincount(codes[mask], weights=values[mask], minlength=len(labels))
+        order = np.argsort(sums)[::-1][:top]
+        return [(labels[i], float(sums[i])) for i in order]
+
+    def percentiles(self, table: str, value: str, q=(50, 90, 95, 99), key: str = None, label: str = None) -> dict:
+        """Percentiles of ``value``, optionally restricted to one ``key`` label"""
+        values = np.asarray(self.column(table, value))
+        if key is not None:
+            labels = self.labels(table, key)
+            if label not in labels:
+                return {p: None for p in q}
+            values = values[self.column(table, key) == labels.index(label)]
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {p: None for p in q}
+        return dict(zip(q, (float(v) for v in np.percentile(values, q))))
+
+    def time_buckets(self, table: str, value: str, unit: str = "M", date_column: str = "txn_date") -> list:
+        """Sum ``value`` per calendar bucket (``D``, ``W``, ``M`` or ``Y``) of ``date_column``"""
+        dates = np.asarray(self.column(table, date_column))
+        values = np.asarray(self.column(table, value))
+        mask = ~np.isnat(dates) & ~np.isnan(values)
+        buckets, inverse = np.unique(dates[mask].astype(f"datetime64[{unit}]"), return_inverse=True)
+        sums = np.bincount(inverse, weights=values[mask], minlength=len(buckets))
+        return [(str(bucket), float(total)) for bucket, total in zip(buckets, sums)]
+
+def _current_version(root: str) -> str:
+    try:
+        with open(os.path.join(root, SNAPSHOT_POINTER)) as f:
+            return os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        # Snapshot exported before versioning: the tables sit in the root
+        return root
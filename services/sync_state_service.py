@@ -0,0 +1,231 @@
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config import Config
+from models.sync_state import SyncState, SyncLease
+
+class SyncStateService:
+    """Server-side sync cursor per realm and entity.
+
+    Workers claim page ranges as leases while holding a row lock on the
+    entity's ``SyncState``, so concurrent workers always get disjoint ranges.
+    A lease is deleted once its page is persisted; leases left behind by a
+    crashed worker expire and are handed out again, which makes syncs
+    resumable.
+    """
+
+    # Weight of the newest page in the moving records/sec average
+    RATE_SMOOTHING = 0.3
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.lease_seconds = Config.SYNC_LEASE_SECONDS
+
+    def _get_state(self, realm_id: str, entity: str, lock: bool = False) -> SyncState:
+        query = self.db.query(SyncState).filter(SyncState.realm_id == str(realm_id), SyncState.entity == entity)
+        if lock:
+            query = query.with_for_update()
+        state = query.first()
+        if state:
+            return state
+
+        try:
+            self.db.add(SyncState(realm_id=str(realm_id), entity=entity, exhausted=True,
+                                  completed_at=datetime.utcnow()))
+            self.db.commit()
+        except IntegrityError:
+            # Another worker created it first
+            self.db.rollback()
+        return query.first()
+
+    def _is_complete(self, state: SyncState) -> bool:
+        return state.exhausted and not state.leases
+
+    def start(self, realm_id: str, entity: str, page_size: int, job_id: str = None, total_count: int = None) -> bool:
+        """Begin a new sync unless one is already running. Returns True if started."""
+        state = self._get_state(realm_id, entity, lock=True)
+        if not self._is_complete(state):
+            self.db.commit()
+            return False
+
+        state.page_size = page_size
+        state.next_start_position = 1
+        state.exhausted = False
+        state.started_at = datetime.utcnow()
+        state.completed_at = None
+        state.job_id = job_id
+        state.total_count = total_count
+        state.pages_fetched = 0
+        state.records_fetched = 0
+        state.api_seconds = 0.0
+        state.db_seconds = 0.0
+        state.last_api_seconds = None
+        state.last_db_seconds = None
+        state.recent_records_per_second = None
+        state.last_page_at = None
+        self.db.commit()
+        return True
+
+    def job_id(self, realm_id: str, entity: str) -> str:
+        state = self._get_state(realm_id, entity)
+        job_id = state.job_id
+        self.db.commit()
+        return job_id
+
+    def claim(self, realm_id: str, entity: str, owner: str, pages: int = 1) -> list:
+        """Claim up to ``pages`` page ranges, reclaiming expired leases first.
+
+        Returns a list of ``{"lease_id", "start_position", "max_results"}`` dicts.
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        state = self._get_state(realm_id, entity, lock=True)
+
+        claimed = []
+        for lease in sorted(state.leases, key=lambda l: l.start_position):
+            if len(claimed) >= pages:
+                break
+            if lease.expires_at <= now:
+                lease.owner = owner
+                lease.expires_at = expires_at
+                claimed.append(lease)
+
+        while len(claimed) < pages and not state.exhausted:
+            lease = SyncLease(start_position=state.next_start_position, max_results=state.page_size,
+                              owner=owner, expires_at=expires_at)
+            state.leases.append(lease)
+            state.next_start_position += state.page_size
+            claimed.append(lease)
+
+        self.db.flush()
+        result = [
+            {"lease_id": lease.id, "start_position": lease.start_position, "max_results": lease.max_results}
+            for lease in claimed
+        ]
+        self.db.commit()
+        return result
+
+    def _owned_lease(self, lease_id: int, owner: str, lock: bool = False):
+        query = (
+            self.db.query(SyncLease)
+            .populate_existing()
+            .filter(SyncLease.id == lease_id, SyncLease.owner == owner)
+        )
+        if lock:
+            # A locking read sees the latest committed owner, not this
+            # transaction's REPEATABLE READ snapshot
+            query = query.with_for_update()
+        return query.first()
+
+    def complete(self, lease_id: int, owner: str, record_count: int,
+                 api_seconds: float = 0.0, db_seconds: float = 0.0) -> bool:
+        """Mark a claimed page as persisted; a short page marks the entity exhausted.
+
+        ``api_seconds`` and ``db_seconds`` are the time spent fetching and
+        persisting the page, and feed the job's progress counters. Returns
+        False, changing nothing, if ``owner`` no longer holds the lease.
+        """
+        lease = self._owned_lease(lease_id, owner)
+        if lease is None:
+            self.db.commit()
+            return False
+        state = self.db.query(SyncState).filter(SyncState.id == lease.sync_state_id).with_for_update().one()
+        # Re-check under the state lock: claim() reassigns leases while holding it
+        lease = self._owned_lease(lease_id, owner, lock=True)
+        if lease is None:
+            self.db.commit()
+            return False
+        if record_count < lease.max_results:
+            state.exhausted = True
+
+        now = datetime.utcnow()
+        since = state.last_page_at or state.started_at or now
+        elapsed = (now - since).total_seconds()
+        if elapsed > 0:
+            page_rate = record_count / elapsed
+            previous = state.recent_records_per_second
+            state.recent_records_per_second = page_rate if previous is None else (
+                self.RATE_SMOOTHING * page_rate + (1 - self.RATE_SMOOTHING) * previous
+            )
+        state.pages_fetched = (state.pages_fetched or 0) + 1
+        state.records_fetched = (state.records_fetched or 0) + record_count
+        state.api_seconds = (state.api_seconds or 0.0) + api_seconds
+        state.db_seconds = (state.db_seconds or 0.0) + db_seconds
+        state.last_api_seconds = api_seconds
+        state.last_db_seconds = db_seconds
+        state.last_page_at = now
+        state.leases.remove(lease)
+        if self._is_complete(state):
+            state.completed_at = datetime.utcnow()
+        self.db.commit()
+        return True
+
+    def _set_expiry(self, lease_id: int, owner: str, expires_at: datetime) -> bool:
+        updated = (
+            self.db.query(SyncLease)
+            .filter(SyncLease.id == lease_id, SyncLease.owner == owner)
+            .update({SyncLease.expires_at: expires_at}, synchronize_session=False)
+        )
+        self.db.commit()
+        return updated > 0
+
+    def renew(self, lease_id: int, owner: str) -> bool:
+        """Extend a lease still held by ``owner``, e.g. before a long page write"""
+        return self._set_expiry(lease_id, owner, datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+
+    def release(self, lease_id: int, owner: str) -> bool:
+        """Give up a page held by ``owner`` so any worker can retry it immediately"""
+        return self._set_expiry(lease_id, owner, datetime.utcnow())
+
+    def is_complete(self, realm_id: str, entity: str) -> bool:
+        state = self._get_state(realm_id, entity)
+        complete = self._is_complete(state)
+        self.db.commit()
+        return complete
+
+    def progress(self, job_id: str) -> dict:
+        """Progress snapshot for every entity synced by ``job_id``, or None if unknown"""
+        states = self.db.query(SyncState).filter(SyncState.job_id == job_id).order_by(SyncState.entity).all()
+        if not states:
+            return None
+
+        now = datetime.utcnow()
+        entities = {}
+        last_activity = None
+        for state in states:
+            activity = state.last_page_at or state.started_at
+            if activity and (last_activity is None or activity > last_activity):
+                last_activity = activity
+            complete = self._is_complete(state)
+            elapsed = ((state.completed_at or now) - state.started_at).total_seconds() if state.started_at else 0
+            pages = state.pages_fetched or 0
+            rate = state.recent_records_per_second
+            eta = None
+            if complete:
+                eta = 0
+            elif state.total_count is not None and rate:
+                eta = max(0, state.total_count - (state.records_fetched or 0)) / rate
+            entities[state.entity] = {
+                "complete": complete,
+                "next_start_position": state.next_start_position,
+                "leases_outstanding": len(state.leases),
+                "pages_fetched": pages,
+                "records_fetched": state.records_fetched or 0,
+                "total_count": state.total_count,
+                "records_per_second": (state.records_fetched or 0) / elapsed if elapsed > 0 else None,
+                "recent_records_per_second": rate,
+                "avg_api_ms": state.api_seconds * 1000 / pages if pages else None,
+                "avg_db_ms": state.db_seconds * 1000 / pages if pages else None,
+                "last_api_ms": state.last_api_seconds * 1000 if state.last_api_seconds is not None else None,
+                "last_db_ms": state.last_db_seconds * 1000 if state.last_db_seconds is not None else None,
+                "eta_seconds": eta,
+                "updated_at": state.last_page_at.isoformat() + "Z" if state.last_page_at else None,
+            }
+        self.db.commit()
+        return {
+            "job_id": job_id,
+            "complete": all(entity["complete"] for entity in entities.values()),
+            # Seconds since any entity of the job last persisted a page (or started)
+            "idle_seconds": (now - last_activity).total_seconds() if last_activity else None,
+            "entities": entities,
+        }
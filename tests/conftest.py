@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Run against an in-memory SQLite database, with none of the import-time
+# MySQL table checks or truncation in database.py.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DB_STARTUP_CHECK", "0")
+os.environ.setdefault("DB_TRUNCATE_ON_STARTUP", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
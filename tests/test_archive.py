@@ -0,0 +1,42 @@
+import gzip
+import json
+from services import archive_service
+from services.archive_service import PayloadArchive
+
+def test_pages_share_a_segment_within_a_process(tmp_path):
+    for start in (1, 11, 21):
+        PayloadArchive(root=str(tmp_path)).append("Bill", "r", start, 10, [{"Id": str(start)}])
+
+    archive = PayloadArchive(root=str(tmp_path))
+    assert len(archive.segments("Bill")) == 1
+    assert [page["start_position"] for page in archive.iter_pages("Bill")] == [1, 11, 21]
+
+def test_torn_member_from_a_crashed_process_is_skipped(tmp_path, monkeypatch):
+    archive = PayloadArchive(root=str(tmp_path))
+    archive.append("Bill", "r", 1, 10, [{"Id": "1"}])
+    torn = gzip.compress(json.dumps({"start_position": 11, "records": [{"Id": "x" * 500}]}).encode())
+    with open(archive.segments("Bill")[0], "ab") as f:
+        f.write(torn[:len(torn) // 2])
+
+    # A restarted process, possibly with the same pid, starts a new segment
+    monkeypatch.setattr(archive_service, "_open_segments", {})
+    monkeypatch.setattr(archive_service, "_PROCESS_TOKEN", "restart")
+    PayloadArchive(root=str(tmp_path)).append("Bill", "r", 11, 10, [{"Id": "11"}])
+
+    assert len(archive.segments("Bill")) == 2
+    assert [page["start_position"] for page in archive.iter_pages("Bill")] == [1, 11]
+
+def test_corrupt_member_does_not_stop_later_segments(tmp_path, monkeypatch):
+    archive = PayloadArchive(root=str(tmp_path))
+    archive.append("Bill", "r", 1, 10, [{"Id": "1"}])
+    path = archive.segments("Bill")[0]
+    torn = gzip.compress(json.dumps({"records": [{"Id": "x" * 500}]}).encode())
+    with open(path, "ab") as f:
+        # What appending after a torn member used to produce
+        f.write(torn[:len(torn) // 2] + gzip.compress(b'{"start_position": 99}\n'))
+
+    monkeypatch.setattr(archive_service, "_open_segments", {})
+    monkeypatch.setattr(archive_service, "_PROCESS_TOKEN", "restart")
+    PayloadArchive(root=str(tmp_path)).append("Bill", "r", 11, 10, [{"Id": "11"}])
+
+    assert [page["start_position"] for page in archive.iter_pages("Bill")] == [1, 11]
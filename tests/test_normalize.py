@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from services.normalize import (
+    normalize_bills, normalize_customers, NormalizedVendorAddr, NormalizedBillAddr
+)
+
+BILL = {
+    "Id": "101",
+    "VendorRef": {"value": "56", "name": "Bob's Burger Joint"},
+    "VendorAddr": {"Id": "9", "Line1": "1 Main St", "City": "Austin", "CountrySubDivisionCode": "TX",
+                   "PostalCode": "73301"},
+    "CurrencyRef": {"value": "USD", "name": "United States Dollar"},
+    "TxnDate": "2024-03-01",
+    "DueDate": "2024-03-31",
+    "TotalAmt": 250,
+    "Balance": "12.5",
+    "MetaData": {"CreateTime": "2024-03-01T10:15:00-08:00", "LastUpdatedTime": "2024-03-02T18:00:00Z"},
+    "Line": [
+        {"LineNum": 1, "Description": "Pumps", "Amount": 200,
+         "ItemBasedExpenseLineDetail": {"ItemRef": {"value": "11", "name": "Pump"}, "Qty": 2.0, "UnitPrice": 100}},
+        {"LineNum": 2, "Amount": "50.00"},
+    ],
+}
+
+CUSTOMER = {
+    "Id": "7",
+    "SyncToken": "3",
+    "domain": "QBO",
+    "GivenName": "Amy",
+    "DisplayName": "Amy's Bird Sanctuary",
+    "FullyQualifiedName": "Amy's Bird Sanctuary",
+    "CompanyName": "Amy's Bird Sanctuary",
+    "FamilyName": "Lauterbach",
+    "PrimaryPhone": {"FreeFormNumber": "(650) 555-3311"},
+    "PrimaryEmailAddr": {"Address": "birds@example.com"},
+    "BalanceWithJobs": "239",
+    "PreferredDeliveryMethod": "Print",
+    "PrintOnCheckName": "Amy's Bird Sanctuary",
+    "Balance": 239,
+    "BillAddr": {"Id": "2", "Line1": "4581 Finch St.", "City": "Bayshore", "CountrySubDivisionCode": "CA",
+                 "PostalCode": "94326", "Lat": "INVALID", "Lon": "INVALID"},
+    "MetaData": {"CreateTime": "2024-01-05T09:00:00Z", "LastUpdatedTime": "2024-01-06T09:30:00-08:00"},
+}
+
+def test_bill_fields_match_the_inline_parsing():
+    [bill] = normalize_bills([BILL])
+
+    assert bill.bill_id == "101"
+    assert (bill.vendor_ref, bill.vendor_name) == ("56", "Bob's Burger Joint")
+    assert bill.vendor_addr == NormalizedVendorAddr("1 Main St", "Austin", "TX", "73301")
+    assert (bill.currency_code, bill.currency_name) == ("USD", "United States Dollar")
+    assert (bill.txn_date, bill.due_date) == (datetime(2024, 3, 1), datetime(2024, 3, 31))
+    assert (bill.total_amt, bill.balance) == (250.0, 12.5)
+    assert bill.create_time == datetime.fromisoformat("2024-03-01T10:15:00-08:00")
+    assert bill.last_updated_time == datetime(2024, 3, 2, 18, tzinfo=timezone.utc)
+
+    pump, bare = bill.line_items
+    assert pump == (1, "Pumps", 200.0, "11", "Pump", 2, 100.0)
+    assert type(pump.qty) is int
+    assert bare == (2, None, 50.0, None, None, 0, 0.0)
+
+def test_bill_without_optional_parts():
+    [bill] = normalize_bills([{"Id": "102"}, {"VendorRef": {"value": "1"}}])
+
+    assert bill == ("102", None, None, None, None, None, None, None, 0.0, 0.0, None, None, ())
+
+def test_customer_fields_match_the_inline_parsing():
+    [customer] = normalize_customers([CUSTOMER])
+
+    assert customer.customer_id == "7"
+    assert customer.sync_token == "3"
+    assert (customer.given_name, customer.family_name) == ("Amy", "Lauterbach")
+    assert customer.primary_phone_free_form_number == "(650) 555-3311"
+    assert customer.primary_email_addr == "birds@example.com"
+    assert (customer.balance_with_jobs, customer.balance) == (239.0, 239.0)
+    assert (customer.active, customer.job, customer.taxable, customer.sparse) == (True, False, False, False)
+    assert customer.bill_addr == NormalizedBillAddr("2", "4581 Finch St.", "Bayshore", "CA", "94326",
+                                                    "INVALID", "INVALID")
+    assert customer.has_metadata
+    assert customer.create_time == datetime(2024, 1, 5, 9, tzinfo=timezone.utc)
+    assert customer.last_updated_time == datetime.fromisoformat("2024-01-06T09:30:00-08:00")
+
+def test_customer_without_optional_parts():
+    [customer] = normalize_customers([{"Id": "8", "DisplayName": "Bare"}, {"DisplayName": "No Id"}])
+
+    assert customer.display_name == "Bare"
+    assert customer.primary_phone_free_form_number is None
+    assert customer.primary_email_addr is None
+    assert customer.bill_addr is None
+    assert not customer.has_metadata
+    assert (customer.create_time, customer.last_updated_time) == (None, None)
+    assert (customer.balance, customer.bill_with_parent) == (0.0, False)
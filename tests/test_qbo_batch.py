@@ -0,0 +1,80 @@
+import re
+import pytest
+import requests
+from services import qbo_service
+from services.qbo_service import QBOService
+
+QUERY = re.compile(r"SELECT \* FROM (\w+) STARTPOSITION (\d+) MAXRESULTS (\d+)")
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+class StubBatchEndpoint:
+    """Answers /batch requests in reverse order, faulting or omitting chosen positions"""
+
+    def __init__(self, faults=(), missing=()):
+        self.faults = set(faults)
+        self.missing = set(missing)
+        self.calls = []
+
+    def __call__(self, url, headers=None, json=None, **kwargs):
+        assert url.endswith("/batch")
+        assert headers["Content-Type"] == "application/json"
+        items = json["BatchItemRequest"]
+        self.calls.append(len(items))
+
+        responses = []
+        for item in reversed(items):
+            entity, start, count = QUERY.match(item["Query"]).groups()
+            start = int(start)
+            if start in self.missing:
+                continue
+            if start in self.faults:
+                responses.append({"bId": item["bId"], "Fault": {"Error": [{"Message": f"bad page {start}"}]}})
+            else:
+                records = [{"Id": str(start + i)} for i in range(int(count))]
+                responses.append({"bId": item["bId"], "QueryResponse": {entity: records}})
+        return StubResponse({"BatchItemResponse": responses})
+
+@pytest.fixture
+def service(monkeypatch):
+    def install(endpoint):
+        monkeypatch.setattr(qbo_service.requests, "post", endpoint)
+        return QBOService(db=None, archive_enabled=False)
+    return install
+
+def test_partial_faults_are_returned_in_request_order(service):
+    endpoint = StubBatchEndpoint(faults={4}, missing={7})
+    requests_ = [("Bill", 1, 3), ("Bill", 4, 3), ("Customer", 1, 2), ("Bill", 7, 3)]
+
+    results = service(endpoint).fetch_batch(requests_, "token")
+
+    assert [(r["entity"], r["start_position"]) for r in results] == [(e, s) for e, s, _ in requests_]
+    assert [r["Id"] for r in results[0]["records"]] == ["1", "2", "3"]
+    assert results[1]["records"] is None and results[1]["fault"] == "bad page 4"
+    assert [r["Id"] for r in results[2]["records"]] == ["1", "2"]
+    assert results[3]["records"] is None and results[3]["fault"] == "No response for batch item"
+
+def test_requests_are_chunked_at_the_batch_limit(service):
+    endpoint = StubBatchEndpoint()
+    requests_ = [("Customer", 1 + page * 2, 2) for page in range(35)]
+
+    results = service(endpoint).fetch_batch(requests_, "token")
+
+    assert endpoint.calls == [30, 5]
+    assert [r["start_position"] for r in results] == [start for _, start, _ in requests_]
+    assert all(r["fault"] is None and len(r["records"]) == 2 for r in results)
+
+def test_transport_errors_raise(service):
+    def failing_post(*args, **kwargs):
+        raise requests.exceptions.ConnectionError("refused")
+
+    with pytest.raises(Exception, match="Failed to fetch batch"):
+        service(failing_post).fetch_batch([("Bill", 1, 3)], "token")
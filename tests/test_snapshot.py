@@ -0,0 +1,39 @@
+import os
+from datetime import date
+from services.analytics_service import SnapshotExporter
+from services.snapshot_query import SnapshotQuery, SNAPSHOT_VERSION_PREFIX
+
+class StubExporter(SnapshotExporter):
+    """Exports fixed rows instead of querying the database"""
+
+    def __init__(self, root, amount):
+        super().__init__(db=None, root=root)
+        self.amount = amount
+
+    def _bill_rows(self):
+        return [(1, date(2024, 1, 5), date(2024, 2, 5), self.amount, 0.0, "Acme")]
+
+    def _line_item_rows(self):
+        return [(1, date(2024, 1, 5), "Acme", "Pump", 1, self.amount, self.amount)]
+
+def versions(root):
+    return sorted(name for name in os.listdir(root) if name.startswith(SNAPSHOT_VERSION_PREFIX))
+
+def test_reader_keeps_its_version_across_an_export(tmp_path):
+    root = str(tmp_path / "analytics")
+    StubExporter(root, 10.0).export()
+    reader = SnapshotQuery(root)
+
+    StubExporter(root, 20.0).export()
+
+    assert reader.group_sum("bills", "vendor", "total_amt") == [("Acme", 10.0)]
+    assert SnapshotQuery(root).group_sum("bills", "vendor", "total_amt") == [("Acme", 20.0)]
+
+def test_only_the_current_and_previous_versions_are_kept(tmp_path):
+    root = str(tmp_path / "analytics")
+    for amount in (1.0, 2.0, 3.0):
+        StubExporter(root, amount).export()
+
+    assert len(versions(root)) == 2
+    assert SnapshotQuery(root).path == os.path.join(root, versions(root)[-1])
+    assert not [name for name in os.listdir(root) if name.startswith(".")]
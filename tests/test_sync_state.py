@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import db
+from models.sync_state import SyncLease
+from services.sync_state_service import SyncStateService
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sync.db'}")
+    db.Model.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    opened = []
+
+    def open_session():
+        session = Session()
+        opened.append(session)
+        return session
+
+    yield open_session
+    for session in opened:
+        session.close()
+    engine.dispose()
+
+@pytest.fixture
+def workers(sessions):
+    """Two services on separate sessions, as two workers would have"""
+    first, second = SyncStateService(sessions()), SyncStateService(sessions())
+    first.start("realm", "Bill", page_size=10, job_id="job")
+    return first, second
+
+def test_claims_are_disjoint(workers):
+    first, second = workers
+
+    a = first.claim("realm", "Bill", "a", pages=2)
+    b = second.claim("realm", "Bill", "b", pages=2)
+
+    assert [lease["start_position"] for lease in a] == [1, 11]
+    assert [lease["start_position"] for lease in b] == [21, 31]
+    assert all(lease["max_results"] == 10 for lease in a + b)
+
+def test_expired_lease_is_reclaimed_first(workers):
+    first, second = workers
+    first.lease_seconds = 0
+    [expired] = first.claim("realm", "Bill", "a")
+
+    [reclaimed, fresh] = second.claim("realm", "Bill", "b", pages=2)
+
+    assert reclaimed == expired
+    assert fresh["start_position"] == 11
+
+def test_old_owner_loses_a_reclaimed_lease(workers, sessions):
+    first, second = workers
+    first.lease_seconds = 0
+    [lease] = first.claim("realm", "Bill", "a")
+    second.claim("realm", "Bill", "b")
+
+    assert first.renew(lease["lease_id"], "a") is False
+    assert first.release(lease["lease_id"], "a") is False
+    assert first.complete(lease["lease_id"], "a", record_count=10) is False
+    assert sessions().get(SyncLease, lease["lease_id"]).owner == "b"
+
+    assert second.renew(lease["lease_id"], "b") is True
+    assert second.complete(lease["lease_id"], "b", record_count=10) is True
+    assert sessions().get(SyncLease, lease["lease_id"]) is None
+
+def test_released_lease_can_be_claimed_immediately(workers):
+    first, second = workers
+    [lease] = first.claim("realm", "Bill", "a")
+
+    assert first.release(lease["lease_id"], "a") is True
+    assert second.claim("realm", "Bill", "b") == [lease]
+
+def test_short_page_exhausts_the_entity(workers):
+    first, second = workers
+    [full, short] = first.claim("realm", "Bill", "a", pages=2)
+
+    assert first.complete(short["lease_id"], "a", record_count=4) is True
+    assert second.claim("realm", "Bill", "b") == []
+    assert not second.is_complete("realm", "Bill")
+
+    assert first.complete(full["lease_id"], "a", record_count=10) is True
+    assert second.is_complete("realm", "Bill")
+    progress = second.progress("job")
+    assert progress["complete"] is True
+    assert progress["entities"]["Bill"]["records_fetched"] == 14
+    assert progress["entities"]["Bill"]["pages_fetched"] == 2